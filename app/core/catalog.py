@@ -0,0 +1,102 @@
+from django.core.cache import cache
+from opac_schema.v1.models import Issue as OPACIssue
+from spf import settings
+
+import dsm.ingress as dsm_ingress
+import time
+
+
+CATALOG_VERSION_KEY = 'spf:catalog:version'
+
+
+def _new_catalog_version():
+    # a versão inicial é derivada do horário, de modo que uma chave removida do cache (expurgo ou limpeza) não volte
+    # a um valor já usado por páginas ainda em cache
+    return time.time_ns()
+
+
+def _get_catalog_version():
+    return cache.get_or_set(CATALOG_VERSION_KEY, _new_catalog_version, None)
+
+
+def invalidate_catalog():
+    """
+    Descarta todas as projeções em cache (deve ser chamada após migrações). A versão é mantida no cache compartilhado
+    pela aplicação web e pelos workers, que realizam as migrações.
+    """
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, _new_catalog_version(), None)
+
+
+class JournalCatalog:
+    """
+    Projeção do catálogo de periódicos, compatível com django.core.paginator.Paginator.
+    Cada página é obtida com skip/limit apenas com os campos exibidos e mantida em cache por
+    JOURNAL_CATALOG_TIMEOUT segundos ou até a invalidação do catálogo.
+    """
+    FIELDS = ('jid', 'title', 'short_title', 'acronym', 'print_issn', 'eletronic_issn', 'scielo_issn')
+
+    def __init__(self):
+        self.version = _get_catalog_version()
+
+    def _key(self, *args):
+        return ':'.join(['spf:catalog:journals', str(self.version)] + [str(a) for a in args])
+
+    def _queryset(self):
+        return dsm_ingress._journals_manager.get_journals().only(*self.FIELDS).order_by('acronym')
+
+    def count(self):
+        return cache.get_or_set(self._key('count'), lambda: self._queryset().count(), settings.JOURNAL_CATALOG_TIMEOUT)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+
+        start, stop = key.start or 0, key.stop
+
+        def get_page():
+            return [{f: getattr(j, f, None) for f in self.FIELDS} for j in self._queryset()[start:stop]]
+
+        return cache.get_or_set(self._key(start, stop), get_page, settings.JOURNAL_CATALOG_TIMEOUT)
+
+
+def _volume_label(issue):
+    volume = ''
+
+    if issue.get('volume'):
+        volume = 'v' + str(issue['volume'])
+
+    if issue.get('number'):
+        volume += 'n' + str(issue['number'])
+
+    return volume
+
+
+def get_issues_by_year(journal_id):
+    """
+    Agrupa os fascículos de um periódico por ano (e seus volumes/números) em uma única agregação no MongoDB.
+    O resultado é mantido em cache por JOURNAL_CATALOG_TIMEOUT segundos ou até a invalidação do catálogo.
+    """
+    key = ':'.join(['spf:catalog:issues', str(_get_catalog_version()), str(journal_id)])
+
+    def aggregate():
+        pipeline = [
+            {'$match': {'journal': journal_id}},
+            {'$project': {'_id': 0, 'year': 1, 'volume': 1, 'number': 1, 'order': 1}},
+            {'$sort': {'year': -1, 'order': 1}},
+            {'$group': {'_id': '$year', 'issues': {'$push': {'volume': '$volume', 'number': '$number'}}}},
+            {'$sort': {'_id': -1}},
+        ]
+
+        return [
+            {'year': g['_id'], 'volumes': [_volume_label(i) for i in g['issues']]}
+            for g in OPACIssue.objects.aggregate(pipeline)
+            if g['_id']
+        ]
+
+    return cache.get_or_set(key, aggregate, settings.JOURNAL_CATALOG_TIMEOUT)
@@ -1,15 +1,37 @@
 from datetime import datetime
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from django.utils.translation import gettext as _
 from django.contrib.auth.models import (
     Group,
     User,
 )
+from django_celery_results.models import TaskResult
+from dsm.extdeps.isis_migration.migration_models import ISISDocument
+from mongoengine import QuerySet
 from core.models import (
     GROUP_MANAGER,
     SCOPE_ALL_USERS,
     IngressPackage,
     MigrationPackage,
     Event,
+    MigrationLedger,
+    TaskProgress,
+    TaskResultDetail,
 )
+from core.events import event_sink
+from core.status import touch_status_version
+from core.metrics import EVENTS
+from core.utils import KeysetPage
+from spf import settings
+
+import dsm.migration as dsm_migration
+import hashlib
+import json
+import re
 
 
 def _is_privileged_user(user):
@@ -23,6 +45,46 @@ def _get_objects_from_user_and_scope(user, scope, model_class):
         return model_class.objects.filter(user=user)
 
 
+def _datetime_cursor(obj):
+    return '%s_%d' % (obj.datetime.isoformat(), obj.id)
+
+
+def _parse_datetime_cursor(cursor):
+    try:
+        dt, obj_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(dt), int(obj_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def paginate_by_datetime_keyset(queryset, after=None, before=None, last=False, items_per_page=25):
+    """
+    Pagina um QuerySet em ordem decrescente de (datetime, id), sem OFFSET e sem COUNT(*).
+    after e before são cursores (datetime_id) do último e do primeiro item da página exibida.
+    """
+    after = _parse_datetime_cursor(after)
+    before = _parse_datetime_cursor(before)
+
+    if before or last:
+        if before:
+            dt, obj_id = before
+            queryset = queryset.filter(Q(datetime__gt=dt) | Q(datetime=dt, id__gt=obj_id))
+        items = list(queryset.order_by('datetime', 'id')[:items_per_page + 1])
+        has_previous = len(items) > items_per_page
+        items = list(reversed(items[:items_per_page]))
+        has_next = bool(before)
+    else:
+        if after:
+            dt, obj_id = after
+            queryset = queryset.filter(Q(datetime__lt=dt) | Q(datetime=dt, id__lt=obj_id))
+        items = list(queryset.order_by('-datetime', '-id')[:items_per_page + 1])
+        has_next = len(items) > items_per_page
+        items = items[:items_per_page]
+        has_previous = bool(after)
+
+    return KeysetPage(items, has_previous, has_next, _datetime_cursor)
+
+
 def get_ingress_packages_from_user_and_scope(user, scope):
     return _get_objects_from_user_and_scope(user, scope, IngressPackage)
 
@@ -31,6 +93,28 @@ def get_events_from_user_and_scope(user, scope):
     return _get_objects_from_user_and_scope(user, scope, Event)
 
 
+def filter_events(queryset, pid=None, package=None, status=None, name=None):
+    """
+    Filtra eventos pelo PID ou pelo pacote registrados na anotação (consultas por contenção, atendidas pelo índice GIN),
+    pelo estado e pelo nome do evento.
+    """
+    if pid:
+        queryset = queryset.filter(annotation__contains={'pid': pid})
+
+    if package:
+        queryset = queryset.filter(
+            Q(annotation__contains={'package_file': package}) | Q(annotation__contains={'file_name': package})
+        )
+
+    if status:
+        queryset = queryset.filter(status=status)
+
+    if name:
+        queryset = queryset.filter(name=name)
+
+    return queryset
+
+
 def get_user_from_username(username):
     return User.objects.get(username=username)
 
@@ -43,8 +127,44 @@ def get_users(include_superuser=False):
     return User.objects.filter(is_superuser=include_superuser)
 
 
+def _groups_names_cache_key(user_id):
+    return 'spf:groups_names:%s' % user_id
+
+
 def get_groups_names_from_user(user):
-    return [g.name for g in user.groups.all()]
+    """
+    Obtém os nomes dos grupos do usuário uma única vez por requisição (o resultado é guardado no próprio objeto)
+    e, caso PERMISSIONS_CACHE_TIMEOUT seja maior que zero, também entre requisições.
+    """
+    if not user.is_authenticated:
+        return []
+
+    groups_names = getattr(user, '_groups_names', None)
+
+    if groups_names is None:
+        if settings.PERMISSIONS_CACHE_TIMEOUT:
+            groups_names = cache.get(_groups_names_cache_key(user.id))
+
+        if groups_names is None:
+            # utiliza os grupos pré-carregados (prefetch_related), quando disponíveis
+            groups_names = [g.name for g in user.groups.all()]
+
+            if settings.PERMISSIONS_CACHE_TIMEOUT:
+                cache.set(_groups_names_cache_key(user.id), groups_names, settings.PERMISSIONS_CACHE_TIMEOUT)
+
+        user._groups_names = groups_names
+
+    return groups_names
+
+
+def invalidate_groups_names_from_user(user):
+    cache.delete(_groups_names_cache_key(user.id))
+    if getattr(user, '_groups_names', None) is not None:
+        del user._groups_names
+
+
+def user_has_group(user, group_name):
+    return group_name in get_groups_names_from_user(user)
 
 
 def get_groups_from_user(user):
@@ -52,13 +172,43 @@ def get_groups_from_user(user):
 
 
 def update_user_groups(user, user_groups):
-    for group in get_groups():
-        if group not in user_groups:
-            user.groups.remove(group)
+    update_users_groups({user: [g.name for g in user_groups]})
+
+
+def update_users_groups(users_groups_names):
+    """
+    Atualiza os grupos de vários usuários ({user: [group_name, ...]}) comparando os pares (usuário, grupo) desejados
+    com os existentes e aplicando apenas as diferenças, em lote e em uma única transação.
+    """
+    through = User.groups.through
+    groups_ids = dict(Group.objects.values_list('name', 'id'))
+    users_ids = [u.id for u in users_groups_names]
 
-    for ug in user_groups:
-        user.groups.add(ug)
-        user.save()
+    current = set(through.objects.filter(user_id__in=users_ids).values_list('user_id', 'group_id'))
+    desired = {
+        (u.id, groups_ids[name])
+        for u, groups_names in users_groups_names.items()
+        for name in groups_names
+        if name in groups_ids
+    }
+
+    removed = current - desired
+    added = desired - current
+
+    with transaction.atomic():
+        if removed:
+            query = Q()
+            for user_id, group_id in removed:
+                query |= Q(user_id=user_id, group_id=group_id)
+            through.objects.filter(query).delete()
+
+        if added:
+            through.objects.bulk_create([through(user_id=u, group_id=g) for u, g in added])
+
+    changed = {user_id for user_id, group_id in removed | added}
+    for u in users_groups_names:
+        if u.id in changed:
+            invalidate_groups_names_from_user(u)
 
 
 def get_groups_from_groups_names(groups_names):
@@ -69,17 +219,87 @@ def get_groups():
     return Group.objects.all()
 
 
+def _package_uri_cache_key(pid):
+    return 'spf:package_uri:%s' % pid
+
+
+def get_cached_package_uri(pid):
+    return cache.get(_package_uri_cache_key(pid))
+
+
+def set_cached_package_uri(pid, result):
+    # apenas consultas bem-sucedidas são mantidas em cache
+    if settings.PACKAGE_URI_CACHE_TIMEOUT and not result.get('errors'):
+        cache.set(_package_uri_cache_key(pid), result, settings.PACKAGE_URI_CACHE_TIMEOUT)
+
+
+def invalidate_cached_package_uri(pids):
+    cache.delete_many([_package_uri_cache_key(p) for p in pids])
+
+
 def get_event_from_id(event_id):
     return Event.objects.get(id=event_id)
 
 
+def get_events_status(user, event_ids):
+    """Obtém, em uma única consulta, o estado dos eventos que o usuário pode acompanhar."""
+    events = Event.objects.filter(id__in=event_ids)
+
+    if not _is_privileged_user(user):
+        events = events.filter(user=user)
+
+    return {e['id']: e['status'] for e in events.values('id', 'status')}
+
+
+def get_status_version_tag(user, event_ids, task_ids):
+    """
+    Obtém, com consultas agregadas (sem leitura dos resultados), uma identificação do estado atual dos eventos e das
+    tasks. A identificação muda sempre que um evento é concluído ou que o resultado (ou progresso) de uma task é gravado.
+    """
+    events = Event.objects.filter(id__in=event_ids)
+    if not _is_privileged_user(user):
+        events = events.filter(user=user)
+
+    parts = [user.id, sorted(event_ids), sorted(task_ids)]
+
+    if event_ids:
+        parts.append(events.aggregate(count=Count('id'), finished_count=Count('finished'), last_finished=Max('finished')))
+
+    if task_ids:
+        parts.append(TaskResult.objects.filter(task_id__in=task_ids).aggregate(count=Count('id'), last_done=Max('date_done')))
+        parts.append(TaskProgress.objects.filter(task_id__in=task_ids).aggregate(last_updated=Max('updated')))
+
+    return hashlib.md5(json.dumps(parts, cls=DjangoJSONEncoder).encode()).hexdigest()
+
+
+def get_tasks_status(task_ids):
+    """Obtém, em uma única consulta ao backend de resultados, o estado e o resultado (ou progresso) das tasks."""
+    tasks_status = {tid: {'status': 'PENDING', 'data': None} for tid in task_ids}
+
+    for tr in TaskResult.objects.filter(task_id__in=task_ids).values('task_id', 'status', 'result'):
+        try:
+            data = json.loads(tr['result']) if tr['result'] else None
+        except ValueError:
+            data = tr['result']
+        tasks_status[tr['task_id']] = {'status': tr['status'], 'data': data}
+
+    # progresso agregado das tasks que distribuem o trabalho em outras tasks
+    for tp in TaskProgress.objects.filter(task_id__in=task_ids):
+        tasks_status[tp.task_id]['progress'] = tp.meta()
+
+    return tasks_status
+
+
 def add_event(user, event_name, annotation=None, status=None):
+    """Registra imediatamente um evento em andamento, a ser concluído posteriormente com update_event."""
     event = Event()
     event.user = user
     event.name = event_name
     event.annotation = annotation
     event.status = status or Event.Status.INITIATED
+    event.started = event.datetime = timezone.now()
     event.save()
+    touch_status_version()
 
     return event
 
@@ -87,12 +307,46 @@ def add_event(user, event_name, annotation=None, status=None):
 def update_event(event, args):
     for k, v in args.items():
         setattr(event, k, v)
-    event.datetime = datetime.utcnow()
+
+    if event.status in (Event.Status.COMPLETED, Event.Status.FAILED):
+        _finish_event(event)
+
     event.save()
+    touch_status_version()
+
+    return event
+
+
+def record_event(user, event_name, annotation=None, status=None, started=None):
+    """
+    Registra um evento já concluído, iniciado em started. O evento é gravado em lote (ver core.events) e, portanto,
+    não possui id até a gravação.
+    """
+    event = Event()
+    event.user = user
+    event.name = event_name
+    event.annotation = annotation
+    event.status = status or Event.Status.COMPLETED
+    event.started = event.datetime = started or timezone.now()
+    _finish_event(event)
+
+    event_sink.add(event)
 
     return event
 
 
+def _finish_event(event):
+    event.finished = timezone.now()
+    if event.started:
+        event.duration = round((event.finished - event.started).total_seconds(), 3)
+
+    EVENTS.labels(name=Event.Name(event.name).name, status=Event.Status(event.status).name).inc()
+
+
+def get_task_result_details(task_id, after=0, limit=100):
+    return list(TaskResultDetail.objects.filter(task_id=task_id, id__gt=after).order_by('id')[:limit])
+
+
 def add_ingress_package(user, event_datetime, package_name, status):
     ip = IngressPackage()
     ip.user = user
@@ -104,6 +358,17 @@ def add_ingress_package(user, event_datetime, package_name, status):
     return ip
 
 
+def get_ingress_package_from_id(ingress_package_id):
+    return IngressPackage.objects.get(id=ingress_package_id)
+
+
+def update_ingress_package_status(ingress_package, status):
+    ingress_package.status = status
+    ingress_package.save(update_fields=['status'])
+
+    return ingress_package
+
+
 def add_migration_package(user, event_datetime, path):
     mp = MigrationPackage()
     mp.user = user
@@ -113,3 +378,153 @@ def add_migration_package(user, event_datetime, path):
     mp.save()
 
     return mp
+
+
+def iter_documents_to_migrate(acronym, volume, pub_year, items_per_page=None, after=None):
+    """
+    Percorre os documentos a migrar página a página, por chave (PID): cada página é consultada a partir do último PID
+    da anterior, com custo constante em qualquer profundidade e sem repetir ou omitir documentos incluídos durante a
+    iteração. No máximo items_per_page documentos são mantidos em memória; after retoma a iteração após esse PID.
+    """
+    items_per_page = items_per_page or settings.MIGRATION_LIST_PAGE_SIZE
+    documents = get_documents_to_migrate(acronym, volume, pub_year)
+
+    while True:
+        page = paginate_documents_by_keyset(documents, after=after, items_per_page=items_per_page)
+
+        yield from page
+
+        if not page.has_next():
+            break
+
+        after = page.object_list[-1].pk
+
+
+class DocumentsQueryError(Exception):
+    ...
+
+
+def get_documents_to_migrate(acronym, volume, pub_year):
+    """
+    Obtém o QuerySet (mongoengine) dos documentos a migrar, com os filtros do dsm e sem a paginação solicitada a ele
+    (deslocamento e limite são removidos; a ordenação é definida por quem consome o QuerySet).
+    """
+    documents = dsm_migration.list_documents_to_migrate(acronym, volume, pub_year, "", "", items_per_page=1, page_number=1, status="")
+
+    # a paginação por chave e a contagem dependem de um QuerySet; uma lista (já paginada) seria truncada em silêncio
+    if not isinstance(documents, QuerySet):
+        raise DocumentsQueryError(_('Unexpected result when listing documents to migrate: %s') % type(documents).__name__)
+
+    return documents.skip(0).limit(0)
+
+
+def paginate_documents_by_keyset(documents, after=None, before=None, last=False, items_per_page=25):
+    """
+    Pagina um QuerySet (mongoengine) pela chave primária (PID), com custo constante em qualquer profundidade.
+    """
+    if before or last:
+        if before:
+            documents = documents.filter(pk__lt=before)
+        items = list(documents.order_by('-pk').limit(items_per_page + 1))
+        has_previous = len(items) > items_per_page
+        items = list(reversed(items[:items_per_page]))
+        has_next = bool(before)
+    else:
+        if after:
+            documents = documents.filter(pk__gt=after)
+        items = list(documents.order_by('pk').limit(items_per_page + 1))
+        has_next = len(items) > items_per_page
+        items = items[:items_per_page]
+        has_previous = bool(after)
+
+    return KeysetPage(items, has_previous, has_next, lambda d: d.pk)
+
+
+def normalize_issn(issn):
+    issn = issn.strip().upper().replace('-', '')
+    if len(issn) == 8:
+        return issn[:4] + '-' + issn[4:]
+    return issn
+
+
+def get_pid_v2_prefix(issn, year=None, issue_order=None):
+    """
+    Monta o prefixo de um PID v2 (S + ISSN + ano + ordem do fascículo + ordem do documento)
+    a partir dos seus componentes iniciais.
+    """
+    if issue_order and not year:
+        raise DocumentsQueryError(_('An issue order requires a year'))
+
+    prefix = 'S' + normalize_issn(issn)
+
+    if year:
+        prefix += year.strip()
+
+        if issue_order:
+            prefix += issue_order.strip().zfill(4)
+
+    return prefix
+
+
+def search_isis_documents(issn=None, year=None, issue_order=None, pid=None):
+    """
+    Pesquisa documentos ISIS por componentes do PID. Com PID ou ISSN, a consulta por prefixo utiliza o índice da chave
+    primária apenas no intervalo do prefixo; sem ISSN, percorre todas as chaves do índice (mas não os documentos).
+    """
+    if pid:
+        pid = pid.strip().upper()
+        if not pid.startswith('S'):
+            pid = 'S' + pid
+        return ISISDocument.objects.filter(pk__startswith=pid)
+
+    if issn:
+        return ISISDocument.objects.filter(pk__startswith=get_pid_v2_prefix(issn, year, issue_order))
+
+    if issue_order and not year:
+        raise DocumentsQueryError(_('An issue order requires a year'))
+
+    # sem ISSN, o ano não é prefixo do PID: a expressão é avaliada sobre todas as chaves do índice de _id
+    pattern = '^S.{9}' + re.escape(year.strip())
+    if issue_order:
+        pattern += re.escape(issue_order.strip().zfill(4))
+
+    return ISISDocument.objects.filter(__raw__={'_id': {'$regex': pattern}})
+
+
+def get_documents_fingerprints(pids):
+    """Obtém, em uma única consulta, a impressão digital (data de atualização no ISIS) dos documentos de origem."""
+    fingerprints = {}
+
+    for d in ISISDocument.objects.filter(pk__in=pids).only('isis_updated_date'):
+        if d.isis_updated_date:
+            fingerprints[d.pk] = hashlib.sha1(str(d.isis_updated_date).encode()).hexdigest()
+
+    return fingerprints
+
+
+def get_migration_ledger(pids):
+    return {ml.pid: ml for ml in MigrationLedger.objects.filter(pid__in=pids)}
+
+
+def is_document_migrated(ledger_entry, fingerprint):
+    return ledger_entry is not None and \
+        ledger_entry.status == MigrationLedger.Status.COMPLETED and \
+        fingerprint is not None and \
+        ledger_entry.fingerprint == fingerprint
+
+
+def save_migration_ledger(ledger, entries):
+    """
+    Grava em lote os registros de migração: entries contém os registros já existentes em ledger (atualizados)
+    e os novos (inseridos).
+    """
+    existing = [e for e in entries if e.pid in ledger]
+    new = [e for e in entries if e.pid not in ledger]
+
+    if existing:
+        for e in existing:
+            e.id = ledger[e.pid].id
+        MigrationLedger.objects.bulk_update(existing, ['fingerprint', 'status', 'last_run', 'duration', 'task_id'])
+
+    if new:
+        MigrationLedger.objects.bulk_create(new, ignore_conflicts=True)
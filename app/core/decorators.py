@@ -1,3 +1,4 @@
+from core.controller import get_groups_names_from_user
 from django.contrib import messages
 from django.shortcuts import redirect
 from django.utils.translation import gettext as _
@@ -18,8 +19,9 @@ def allowed_users(allowed_groups=[]):
         def wrapper(request, *args, **kwargs):
             if request.user.is_superuser:
                 return view(request, *args, **kwargs)
-            elif request.user.groups.exists():
-                for gn in [g.name for g in request.user.groups.all()]:
+            groups_names = get_groups_names_from_user(request.user)
+            if groups_names:
+                for gn in groups_names:
                     if gn in allowed_groups:
                         return view(request, *args, **kwargs)
                 messages.warning(request,
@@ -0,0 +1,66 @@
+"""
+Gravação de eventos em lote.
+
+Eventos já concluídos (ver controller.record_event) são acumulados em memória, entre requisições e tasks, e gravados
+com um único bulk_create quando o buffer atinge EVENT_BUFFER_SIZE eventos ou quando o evento mais antigo do buffer
+completa EVENT_BUFFER_TIMEOUT segundos. Os eventos pendentes também são gravados ao final do processo.
+"""
+import atexit
+import threading
+
+from celery.signals import worker_process_shutdown
+from django.db import connection
+from core.models import Event
+from spf import settings
+
+
+class EventSink:
+    def __init__(self, buffer_size=None, timeout=None):
+        self.buffer_size = buffer_size or settings.EVENT_BUFFER_SIZE
+        self.timeout = timeout if timeout is not None else settings.EVENT_BUFFER_TIMEOUT
+
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def add(self, event):
+        with self._lock:
+            self._buffer.append(event)
+            full = len(self._buffer) >= self.buffer_size
+
+            if not full and self._timer is None:
+                # o primeiro evento do buffer define o momento da próxima gravação
+                self._timer = threading.Timer(self.timeout, self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            events, self._buffer = self._buffer, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        if events:
+            Event.objects.bulk_create(events)
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # a conexão com o banco de dados pertence à thread do temporizador
+            connection.close()
+
+
+event_sink = EventSink()
+
+atexit.register(event_sink.flush)
+
+
+@worker_process_shutdown.connect
+def flush_events_on_worker_shutdown(**kwargs):
+    # processos filhos do Celery (prefork) não executam as funções registradas em atexit
+    event_sink.flush()
@@ -0,0 +1,137 @@
+"""
+Leitura incremental de arquivos id (formato gerado pelo utilitário i2id do CISIS).
+
+Um arquivo id é uma sequência de registros, cada um iniciado por uma linha "!ID nnnnnnn" e seguido por uma linha
+"!vNNN!valor" para cada ocorrência de campo. Os registros são lidos como bytes, um por vez, e reescritos sem
+conversão de codificação.
+"""
+from django.utils.translation import gettext as _
+from spf import settings
+
+import math
+import os
+import shutil
+import subprocess
+
+
+RECORD_PREFIX = b'!ID '
+
+# campos que identificam o documento ao qual pertence um registro; os registros de um mesmo documento são
+# consecutivos no arquivo e não devem ser separados em partes distintas
+GROUP_FIELDS = {
+    'artigo': (b'!v702!', b'!v880!'),
+}
+
+
+class CISISNotFoundError(Exception):
+    ...
+
+
+def iter_id_file_records(path):
+    """Percorre os registros de um arquivo id, mantendo em memória apenas o registro atual (lista de linhas)."""
+    record = []
+
+    with open(path, 'rb') as fin:
+        for line in fin:
+            if line.startswith(RECORD_PREFIX) and record:
+                yield record
+                record = []
+            if not line.endswith(b'\n'):
+                line += b'\n'
+            record.append(line)
+
+    if record:
+        yield record
+
+
+def get_record_group(record, data_type):
+    for field in GROUP_FIELDS.get(data_type, ()):
+        for line in record:
+            if line.startswith(field):
+                return line[len(field):].strip()
+
+
+def iter_id_file_chunks(path, size, data_type=None):
+    """
+    Agrupa os registros de um arquivo id em partes de aproximadamente size registros. Uma parte só é encerrada
+    entre registros de documentos diferentes.
+    """
+    chunk = []
+    previous_group = None
+
+    for record in iter_id_file_records(path):
+        group = get_record_group(record, data_type)
+
+        if len(chunk) >= size and (group is None or group != previous_group):
+            yield chunk
+            chunk = []
+
+        chunk.append(record)
+        previous_group = group
+
+    if chunk:
+        yield chunk
+
+
+def write_id_file(records, path):
+    with open(path, 'wb') as fout:
+        for record in records:
+            fout.writelines(record)
+
+
+def count_id_file_records(path):
+    with open(path, 'rb') as fin:
+        return sum(1 for line in fin if line.startswith(RECORD_PREFIX))
+
+
+def get_i2id_path():
+    """Obtém o caminho do utilitário i2id, procurado em CISIS_PATH ou, se não definido, no PATH."""
+    i2id_path = shutil.which('i2id', path=settings.CISIS_PATH or None)
+    if not i2id_path:
+        raise CISISNotFoundError(_('CISIS utility i2id not found, set CISIS_PATH to the CISIS directory'))
+
+    return i2id_path
+
+
+def export_isis_base(base_path, id_path):
+    """Exporta uma base ISIS (master file) para um arquivo id por meio do utilitário i2id do CISIS."""
+    i2id_path = get_i2id_path()
+
+    with open(id_path, 'wb') as fout:
+        subprocess.run([i2id_path, base_path], stdout=fout, check=True)
+
+    return id_path
+
+
+def split_id_file(path, parts, dest_dir, data_type=None):
+    """
+    Divide um arquivo id em até parts arquivos com intervalos consecutivos de registros de tamanho semelhante,
+    gravados em dest_dir. Os registros de um mesmo documento permanecem no mesmo arquivo.
+    """
+    size = max(math.ceil(count_id_file_records(path) / parts), 1)
+    name = os.path.splitext(os.path.basename(path))[0]
+
+    paths = []
+    fout = None
+    count = 0
+    previous_group = None
+
+    try:
+        for record in iter_id_file_records(path):
+            group = get_record_group(record, data_type)
+
+            if fout is None or (count >= size and (group is None or group != previous_group)):
+                if fout:
+                    fout.close()
+                paths.append(os.path.join(dest_dir, f'{name}_{len(paths) + 1:03d}.id'))
+                fout = open(paths[-1], 'wb')
+                count = 0
+
+            fout.writelines(record)
+            count += 1
+            previous_group = group
+    finally:
+        if fout:
+            fout.close()
+
+    return paths
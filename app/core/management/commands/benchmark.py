@@ -0,0 +1,330 @@
+"""
+Benchmark dos fluxos de ingresso e migração.
+
+Gera pacotes SPS (zip) e arquivos id sintéticos, executa task_ingress_package, task_migrate_isis_db e
+task_migrate_documents de forma síncrona (Celery em modo eager) contra os serviços configurados no ambiente
+(MinIO, MongoDB e PostgreSQL/SQLite locais) e informa vazão, pico de memória alocada pelo Python (tracemalloc) e
+quantidade de consultas SQL e de comandos do MongoDB, comparando-os com uma linha de base gravada anteriormente.
+Cada fluxo é executado duas vezes, de modo que o custo do tracemalloc não afete a medição de duração.
+
+Exemplos:
+    python manage.py benchmark --mongo-uri mongodb://localhost:27017/spf_benchmark --save-baseline
+    python manage.py benchmark --mongo-uri mongodb://localhost:27017/spf_benchmark --check
+"""
+import json
+import os
+import random
+import shutil
+import string
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from core import isis
+from pymongo import monitoring
+from spf import settings
+
+
+BENCHMARKS = ('ingress', 'isis_db', 'documents')
+
+BENCHMARK_USERNAME = 'spf_benchmark'
+
+BENCHMARK_ISSN = '0000-0000'
+
+BENCHMARK_YEAR = '2026'
+
+ARTICLE_XML = '''<?xml version="1.0" encoding="utf-8"?>
+<!DOCTYPE article PUBLIC "-//NLM//DTD JATS (Z39.96) Journal Publishing DTD v1.1 20151215//EN" "https://jats.nlm.nih.gov/publishing/1.1/JATS-journalpublishing1.dtd">
+<article xmlns:xlink="http://www.w3.org/1999/xlink" article-type="research-article" dtd-version="1.1" specific-use="sps-1.9" xml:lang="en">
+<front>
+<journal-meta>
+<journal-id journal-id-type="publisher-id">bench</journal-id>
+<journal-title-group><journal-title>Benchmark</journal-title></journal-title-group>
+<issn pub-type="epub">{issn}</issn>
+<publisher><publisher-name>SciELO</publisher-name></publisher>
+</journal-meta>
+<article-meta>
+<article-id pub-id-type="publisher-id" specific-use="scielo-v3">{v3}</article-id>
+<article-id pub-id-type="publisher-id" specific-use="scielo-v2">{v2}</article-id>
+<title-group><article-title>Benchmark document {number}</article-title></title-group>
+<pub-date publication-format="electronic" date-type="pub"><day>01</day><month>01</month><year>{year}</year></pub-date>
+<volume>1</volume>
+<issue>{issue}</issue>
+<fpage>{number}</fpage>
+<lpage>{number}</lpage>
+</article-meta>
+</front>
+<body>
+{body}
+</body>
+</article>
+'''
+
+
+class MongoCommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+# registrado antes da criação das conexões com o MongoDB (que só afeta clientes criados posteriormente)
+mongo_commands = MongoCommandCounter()
+monitoring.register(mongo_commands)
+
+
+def _pid_v2(issue, number):
+    return 'S%s%s%04d%05d' % (BENCHMARK_ISSN, BENCHMARK_YEAR, issue, number)
+
+
+def _pid_v3(rnd):
+    return ''.join(rnd.choice(string.ascii_letters + string.digits) for _ in range(23))
+
+
+def generate_sps_package(path, issue, documents, paragraphs, rnd):
+    """Gera um pacote SPS (zip) com documents documentos XML e seus PDFs."""
+    pids = []
+
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for number in range(1, documents + 1):
+            v2 = _pid_v2(issue, number)
+            name = '%s-bench-%s-%02d-%05d' % (BENCHMARK_ISSN, BENCHMARK_YEAR, issue, number)
+            body = '\n'.join('<p>%s</p>' % ' '.join(rnd.choice(('lorem', 'ipsum', 'dolor', 'sit', 'amet')) for _ in range(60)) for _ in range(paragraphs))
+
+            zf.writestr(name + '.xml', ARTICLE_XML.format(
+                issn=BENCHMARK_ISSN, year=BENCHMARK_YEAR, issue=issue, number=number, v2=v2, v3=_pid_v3(rnd), body=body,
+            ))
+            zf.writestr(name + '.pdf', b'%PDF-1.4\n' + os.urandom(4096))
+            pids.append(v2)
+
+    return pids
+
+
+def generate_id_file(path, documents, rnd):
+    """Gera um arquivo id (formato i2id) de uma base artigo com dois registros (o, h) por documento."""
+    pids = []
+    mfn = 0
+
+    with open(path, 'w', encoding='iso-8859-1') as fout:
+        for number in range(1, documents + 1):
+            pid = _pid_v2(1, number)
+            file_path = 'bench/v1n1/%05d.xml' % number
+            for record_type in ('o', 'h'):
+                mfn += 1
+                fout.write('!ID %07d\n' % mfn)
+                fout.write('!v035!%s\n' % BENCHMARK_ISSN)
+                fout.write('!v702!%s\n' % file_path)
+                fout.write('!v706!%s\n' % record_type)
+                fout.write('!v880!%s\n' % pid)
+                fout.write('!v091!%s0101\n' % BENCHMARK_YEAR)
+                fout.write('!v093!%s0101\n' % BENCHMARK_YEAR)
+                if record_type == 'h':
+                    fout.write('!v012!Benchmark document %d^len\n' % number)
+                    fout.write('!v065!%s0101\n' % BENCHMARK_YEAR)
+                    fout.write('!v010!%s^nAuthor^sBenchmark\n' % ''.join(rnd.choice(string.ascii_uppercase) for _ in range(8)))
+            pids.append(pid)
+
+    return pids
+
+
+def measure(name, items, func, prepare=None):
+    """
+    Executa func duas vezes: a primeira mede duração, consultas SQL e comandos do MongoDB; a segunda mede apenas o pico
+    de memória, com o tracemalloc ativo (o rastreamento das alocações torna a execução mais lenta). prepare, se
+    informado, é executado antes de cada execução, fora das medições.
+    """
+    if prepare:
+        prepare()
+
+    mongo_commands_before = mongo_commands.count
+    started = time.monotonic()
+
+    with CaptureQueriesContext(connection) as queries:
+        result = func()
+
+    seconds = time.monotonic() - started
+    commands = mongo_commands.count - mongo_commands_before
+
+    if prepare:
+        prepare()
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'name': name,
+        'items': items,
+        'seconds': round(seconds, 3),
+        'throughput': round(items / seconds, 2) if seconds else None,
+        'peak_memory_mb': round(peak / 1024 / 1024, 2),
+        'sql_queries': len(queries.captured_queries),
+        'mongo_commands': commands,
+        'result': result,
+    }
+
+
+def compare(measurement, baseline, tolerance):
+    """Retorna as regressões de measurement em relação a baseline acima da tolerância (fração) informada."""
+    regressions = []
+
+    if baseline.get('throughput') and measurement['throughput'] is not None:
+        if measurement['throughput'] < baseline['throughput'] * (1 - tolerance):
+            regressions.append('throughput %s < %s' % (measurement['throughput'], baseline['throughput']))
+
+    for key in ('peak_memory_mb', 'sql_queries', 'mongo_commands'):
+        if baseline.get(key) and measurement[key] > baseline[key] * (1 + tolerance):
+            regressions.append('%s %s > %s' % (key, measurement[key], baseline[key]))
+
+    return regressions
+
+
+class Command(BaseCommand):
+    help = 'Runs the ingestion and migration benchmarks with synthetic data and compares them with a stored baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS))
+        parser.add_argument('--packages', type=int, default=10, help='Number of SPS packages ingested')
+        parser.add_argument('--documents-per-package', type=int, default=5)
+        parser.add_argument('--paragraphs', type=int, default=50, help='Number of body paragraphs of each XML')
+        parser.add_argument('--documents', type=int, default=500, help='Number of documents of the id file')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--mongo-uri', help='MongoDB used instead of DATABASE_CONNECT_URL (mongodb://, or mongomock:// when mongomock is installed)')
+        parser.add_argument('--baseline', default=os.path.join(settings.BASE_DIR, 'benchmark_baseline.json'))
+        parser.add_argument('--save-baseline', action='store_true', help='Stores the results as the new baseline')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='Accepted variation in relation to the baseline')
+        parser.add_argument('--check', action='store_true', help='Fails when a result regresses beyond the tolerance')
+
+    def handle(self, *args, **options):
+        if options['mongo_uri']:
+            self._connect_mongo(options['mongo_uri'])
+
+        from spf.celery import app
+
+        # as tasks (e as tasks que elas disparam, como os chords da migração) são executadas no próprio processo
+        app.conf.task_always_eager = True
+        app.conf.task_eager_propagates = True
+
+        rnd = random.Random(options['seed'])
+        user, created = User.objects.get_or_create(username=BENCHMARK_USERNAME)
+        if created:
+            user.set_unusable_password()
+            user.save()
+
+        work_dir = tempfile.mkdtemp(prefix='spf-benchmark-')
+
+        results = []
+        try:
+            if 'ingress' in options['only']:
+                results.append(self._bench_ingress(work_dir, user, options, rnd))
+
+            pids = []
+            if 'isis_db' in options['only'] or 'documents' in options['only']:
+                id_path = os.path.join(work_dir, 'artigo.id')
+                pids = generate_id_file(id_path, options['documents'], rnd)
+
+                # a migração de documentos depende dos registros ISIS gravados por esta etapa
+                isis_db = self._bench_isis_db(id_path, options)
+                if 'isis_db' in options['only']:
+                    results.append(isis_db)
+
+            if 'documents' in options['only']:
+                results.append(self._bench_documents(pids))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        self._report(results, options)
+
+    def _connect_mongo(self, uri):
+        import mongoengine
+
+        mongoengine.disconnect_all()
+        mongoengine.connect(host=uri)
+
+    def _bench_ingress(self, work_dir, user, options, rnd):
+        from core.tasks import task_ingress_package
+
+        packages = [
+            os.path.join(work_dir, '%s-bench-%s-%02d.zip' % (BENCHMARK_ISSN, BENCHMARK_YEAR, issue))
+            for issue in range(1, options['packages'] + 1)
+        ]
+        seed = rnd.random()
+
+        def prepare():
+            # a task remove o pacote após o ingresso; cada execução recebe pacotes idênticos
+            package_rnd = random.Random(seed)
+            for issue, path in enumerate(packages, 1):
+                generate_sps_package(path, issue, options['documents_per_package'], options['paragraphs'], package_rnd)
+
+        def run():
+            failed = 0
+            for path in packages:
+                result = task_ingress_package.apply(args=(path, os.path.basename(path), user.id)).get()
+                failed += bool(result.get('error'))
+            return {'failed': failed}
+
+        return measure('ingress', len(packages), run, prepare)
+
+    def _bench_isis_db(self, id_path, options):
+        from core.tasks import task_migrate_isis_db
+
+        records = isis.count_id_file_records(id_path)
+
+        def run():
+            summary = task_migrate_isis_db.apply(args=('artigo', id_path)).get()
+            return {'succeeded': summary['succeeded'], 'failed': summary['failed']}
+
+        return measure('isis_db', records, run)
+
+    def _bench_documents(self, pids):
+        from core.tasks import task_migrate_documents
+
+        def run():
+            # force=True: a linha de base não deve depender do registro de migrações de execuções anteriores
+            result = task_migrate_documents.apply(kwargs={'pid': ','.join(pids), 'force': True}).get()
+            return {k: result.get(k) for k in ('documents', 'batches')}
+
+        return measure('documents', len(pids), run)
+
+    def _report(self, results, options):
+        baseline = {}
+        if os.path.exists(options['baseline']):
+            with open(options['baseline']) as fin:
+                baseline = json.load(fin)
+
+        columns = ('name', 'items', 'seconds', 'throughput', 'peak_memory_mb', 'sql_queries', 'mongo_commands')
+        self.stdout.write(' '.join('%16s' % c for c in columns))
+
+        regressions = {}
+        for r in results:
+            self.stdout.write(' '.join('%16s' % r[c] for c in columns))
+            if r['name'] in baseline:
+                regressions[r['name']] = compare(r, baseline[r['name']], options['tolerance'])
+
+        for name, items in regressions.items():
+            for item in items:
+                self.stdout.write(self.style.WARNING('%s: %s' % (name, item)))
+
+        if options['save_baseline']:
+            baseline.update({r['name']: {k: v for k, v in r.items() if k != 'result'} for r in results})
+            with open(options['baseline'], 'w') as fout:
+                json.dump(baseline, fout, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS('Baseline saved to %s' % options['baseline']))
+
+        if options['check'] and any(regressions.values()):
+            raise CommandError('Performance regression in relation to %s' % options['baseline'])
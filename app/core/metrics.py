@@ -0,0 +1,148 @@
+"""
+Métricas no formato do Prometheus.
+
+Em produção, os processos de cada contêiner agregam suas métricas no diretório PROMETHEUS_MULTIPROC_DIR (modo
+multiprocesso do prometheus_client), local ao contêiner e esvaziado na sua inicialização. A aplicação web expõe suas
+métricas em /metrics e cada worker do Celery as expõe na porta METRICS_WORKER_PORT; cada contêiner é coletado
+separadamente.
+"""
+import glob
+import os
+import time
+
+from celery.signals import (
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_shutdown,
+)
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+from spf import settings
+from spf.celery import app
+
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, float('inf'))
+
+TASK_DURATION = Histogram(
+    'spf_task_duration_seconds', 'Task duration', ['task', 'state'], buckets=DURATION_BUCKETS,
+)
+
+TASK_QUEUE_WAIT = Histogram(
+    'spf_task_queue_wait_seconds', 'Time between task publication and execution', ['task'], buckets=DURATION_BUCKETS,
+)
+
+DOCUMENT_MIGRATION_DURATION = Histogram(
+    'spf_document_migration_duration_seconds', 'Duration of the migration of a document', ['status'],
+    buckets=DURATION_BUCKETS,
+)
+
+VIEW_DURATION = Histogram(
+    'spf_view_duration_seconds', 'Request duration by view', ['view', 'method', 'status'], buckets=DURATION_BUCKETS,
+)
+
+EVENTS = Counter(
+    'spf_events_total', 'Finished events by name and status', ['name', 'status'],
+)
+
+PUBLISHED_AT_HEADER = 'spf_published_at'
+
+_tasks_started = {}
+
+
+@before_task_publish.connect
+def add_published_at_header(headers=None, **kwargs):
+    if headers is not None:
+        headers[PUBLISHED_AT_HEADER] = time.time()
+
+
+@task_prerun.connect
+def start_task_timer(task_id=None, task=None, **kwargs):
+    now = time.time()
+    _tasks_started[task_id] = now
+
+    published_at = task.request.get(PUBLISHED_AT_HEADER) or (task.request.headers or {}).get(PUBLISHED_AT_HEADER)
+    if published_at:
+        TASK_QUEUE_WAIT.labels(task=task.name).observe(max(now - published_at, 0))
+
+
+@task_postrun.connect
+def observe_task_duration(task_id=None, task=None, state=None, **kwargs):
+    started = _tasks_started.pop(task_id, None)
+    if started:
+        TASK_DURATION.labels(task=task.name, state=state or '').observe(time.time() - started)
+
+
+class BrokerQueueDepthCollector:
+    """Obtém, a cada coleta, a quantidade de mensagens aguardando em cada fila do broker."""
+    def describe(self):
+        # evita a conexão com o broker no momento do registro do coletor
+        return []
+
+    def collect(self):
+        gauge = GaugeMetricFamily('spf_broker_queue_depth', 'Messages waiting in the broker queue', labels=['queue'])
+
+        try:
+            with app.connection_for_read() as conn:
+                channel = conn.default_channel
+                for queue in settings.METRICS_BROKER_QUEUES:
+                    _, message_count, _ = channel.queue_declare(queue=queue, passive=True)
+                    gauge.add_metric([queue], message_count)
+        except Exception:
+            # broker indisponível ou fila ainda não declarada
+            pass
+
+        yield gauge
+
+
+_broker_registry = CollectorRegistry()
+_broker_registry.register(BrokerQueueDepthCollector())
+
+
+def _get_registry():
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+
+    return REGISTRY
+
+
+def generate_metrics():
+    return generate_latest(_get_registry()) + generate_latest(_broker_registry)
+
+
+def clear_multiprocess_dir():
+    """Remove os arquivos de métricas de execuções anteriores (deve ser chamada antes da criação dos processos)."""
+    multiproc_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if multiproc_dir:
+        for path in glob.glob(os.path.join(multiproc_dir, '*.db')):
+            os.remove(path)
+
+
+def mark_process_dead(pid):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
+
+
+@worker_init.connect
+def start_worker_metrics(**kwargs):
+    # executado no processo principal do worker, antes da criação dos processos filhos
+    clear_multiprocess_dir()
+
+    if settings.METRICS_WORKER_PORT:
+        start_http_server(settings.METRICS_WORKER_PORT, registry=_get_registry())
+
+
+@worker_process_shutdown.connect
+def mark_worker_process_dead(pid=None, **kwargs):
+    mark_process_dead(pid or os.getpid())
@@ -0,0 +1,18 @@
+from core.metrics import VIEW_DURATION
+
+import time
+
+
+class MetricsMiddleware:
+    """Registra a duração de cada requisição, por view, método e código de resposta."""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.monotonic()
+        response = self.get_response(request)
+
+        view = request.resolver_match.view_name if request.resolver_match else 'unresolved'
+        VIEW_DURATION.labels(view=view, method=request.method, status=response.status_code).observe(time.monotonic() - started)
+
+        return response
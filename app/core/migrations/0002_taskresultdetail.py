@@ -0,0 +1,24 @@
+# Generated by Django 3.2.6 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskResultDetail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.CharField(db_index=True, max_length=255)),
+                ('item', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('C', 'Completed'), ('F', 'Failed')], max_length=1)),
+                ('message', models.TextField(null=True)),
+                ('datetime', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.6 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_taskresultdetail'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingresspackage',
+            index=models.Index(fields=['user', 'datetime'], name='core_ingpkg_user_dt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ingresspackage',
+            index=models.Index(fields=['status', 'datetime'], name='core_ingpkg_status_dt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ingresspackage',
+            index=models.Index(fields=['datetime'], name='core_ingpkg_dt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['user', 'datetime'], name='core_event_user_dt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['status', 'datetime'], name='core_event_status_dt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['datetime'], name='core_event_dt_idx'),
+        ),
+    ]
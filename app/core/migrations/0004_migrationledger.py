@@ -0,0 +1,25 @@
+# Generated by Django 3.2.6 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_event_ingresspackage_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MigrationLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pid', models.CharField(max_length=255, unique=True)),
+                ('fingerprint', models.CharField(max_length=64, null=True)),
+                ('status', models.CharField(choices=[('C', 'Completed'), ('F', 'Failed')], max_length=1)),
+                ('last_run', models.DateTimeField()),
+                ('duration', models.FloatField(null=True)),
+                ('task_id', models.CharField(max_length=255, null=True)),
+            ],
+        ),
+    ]
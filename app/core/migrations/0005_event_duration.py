@@ -0,0 +1,34 @@
+# Generated by Django 3.2.6 on 2026-10-18 15:20
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_migrationledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='duration',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='finished',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='started',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='datetime',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 3.2.6 on 2026-10-18 16:05
+
+import ast
+import django.contrib.postgres.indexes
+import django.core.serializers.json
+import json
+
+from django.db import migrations, models
+
+
+def _parse_annotation(value):
+    # as anotações eram gravadas como repr de dicionários Python; valores que não podem ser interpretados como um
+    # dicionário serializável em JSON (texto livre, repr truncado, conjuntos, bytes) são preservados como texto
+    for parse in (ast.literal_eval, json.loads):
+        try:
+            data = parse(value)
+            json.dumps(data, cls=django.core.serializers.json.DjangoJSONEncoder)
+        except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+            continue
+        if isinstance(data, dict):
+            return data
+    return {'text': value}
+
+
+def annotation_to_json(apps, schema_editor):
+    Event = apps.get_model('core', 'Event')
+
+    events = []
+    for ev in Event.objects.exclude(annotation__isnull=True).only('id', 'annotation').iterator(chunk_size=1000):
+        ev.annotation_data = _parse_annotation(ev.annotation)
+        events.append(ev)
+
+        if len(events) >= 1000:
+            Event.objects.bulk_update(events, ['annotation_data'])
+            events = []
+
+    if events:
+        Event.objects.bulk_update(events, ['annotation_data'])
+
+
+def annotation_to_text(apps, schema_editor):
+    Event = apps.get_model('core', 'Event')
+
+    events = []
+    for ev in Event.objects.exclude(annotation_data__isnull=True).only('id', 'annotation_data').iterator(chunk_size=1000):
+        ev.annotation = str(ev.annotation_data)[:200]
+        events.append(ev)
+
+        if len(events) >= 1000:
+            Event.objects.bulk_update(events, ['annotation'])
+            events = []
+
+    if events:
+        Event.objects.bulk_update(events, ['annotation'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_event_duration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='annotation_data',
+            field=models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, null=True),
+        ),
+        migrations.RunPython(annotation_to_json, annotation_to_text),
+        migrations.RemoveField(
+            model_name='event',
+            name='annotation',
+        ),
+        migrations.RenameField(
+            model_name='event',
+            old_name='annotation_data',
+            new_name='annotation',
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['annotation'], name='core_event_annotation_gin'),
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -28,6 +31,13 @@ class IngressPackage(models.Model):
     datetime = models.DateTimeField()
     status = models.CharField(max_length=2, choices=Status.choices, blank=False, null=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'datetime'], name='core_ingpkg_user_dt_idx'),
+            models.Index(fields=['status', 'datetime'], name='core_ingpkg_status_dt_idx'),
+            models.Index(fields=['datetime'], name='core_ingpkg_dt_idx'),
+        ]
+
 
 class MigrationPackage(models.Model):
     class Status(models.TextChoices):
@@ -62,7 +72,14 @@ class Event(models.Model):
     user = models.ForeignKey(User, on_delete=models.PROTECT)
 
     # momento em que o evento foi iniciado
-    datetime = models.DateTimeField(auto_now=True)
+    datetime = models.DateTimeField(default=timezone.now)
+
+    # início e término do evento e sua duração (em segundos)
+    started = models.DateTimeField(null=True)
+
+    finished = models.DateTimeField(null=True)
+
+    duration = models.FloatField(null=True)
 
     # nome do evento
     name = models.CharField(max_length=3, choices=Name.choices, blank=False, null=False)
@@ -70,8 +87,97 @@ class Event(models.Model):
     # estado do evento (iniciado, realizando, concluído)
     status = models.CharField(max_length=1, choices=Status.choices, blank=False, null=False)
 
-    # informação relacionada ao evento
-    annotation = models.CharField(max_length=200, null=True)
+    # informação relacionada ao evento (pid, package_file, file_name, path, error etc.)
+    annotation = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'datetime'], name='core_event_user_dt_idx'),
+            models.Index(fields=['status', 'datetime'], name='core_event_status_dt_idx'),
+            models.Index(fields=['datetime'], name='core_event_dt_idx'),
+            GinIndex(fields=['annotation'], name='core_event_annotation_gin'),
+        ]
+
+
+class TaskResultDetail(models.Model):
+    class Status(models.TextChoices):
+        COMPLETED = 'C', _('Completed')
+        FAILED = 'F', _('Failed')
+
+    # task (raiz) que processou o item
+    task_id = models.CharField(max_length=255, db_index=True)
+
+    # item processado (PID, acrônimo, registro)
+    item = models.CharField(max_length=255)
+
+    # resultado do processamento do item
+    status = models.CharField(max_length=1, choices=Status.choices, blank=False, null=False)
+
+    # informação relacionada ao resultado
+    message = models.TextField(null=True)
+
+    # momento em que o item foi processado
+    datetime = models.DateTimeField(auto_now_add=True)
+
+
+class MigrationLedger(models.Model):
+    class Status(models.TextChoices):
+        COMPLETED = 'C', _('Completed')
+        FAILED = 'F', _('Failed')
+
+    # documento migrado
+    pid = models.CharField(max_length=255, unique=True)
+
+    # impressão digital do documento de origem (ISIS) no momento da migração
+    fingerprint = models.CharField(max_length=64, null=True)
+
+    # resultado da última migração
+    status = models.CharField(max_length=1, choices=Status.choices, blank=False, null=False)
+
+    # momento da última migração
+    last_run = models.DateTimeField()
+
+    # duração (em segundos) da última migração
+    duration = models.FloatField(null=True)
+
+    # task que realizou a última migração
+    task_id = models.CharField(max_length=255, null=True)
+
+
+class TaskProgress(models.Model):
+    """Progresso agregado de uma task (raiz) cujo trabalho é distribuído em outras tasks."""
+    # task (raiz)
+    task_id = models.CharField(max_length=255, unique=True)
+
+    # quantidade de itens a processar, conhecida à medida que o trabalho é distribuído
+    total = models.PositiveIntegerField(default=0)
+
+    # quantidade de itens processados (inclusive os que falharam)
+    done = models.PositiveIntegerField(default=0)
+
+    # quantidade de itens que falharam
+    failed = models.PositiveIntegerField(default=0)
+
+    started = models.DateTimeField(auto_now_add=True)
+
+    updated = models.DateTimeField(auto_now=True)
+
+    def meta(self):
+        elapsed = (self.updated - self.started).total_seconds()
+        rate = self.done / elapsed if elapsed > 0 else 0
+
+        eta = None
+        if rate > 0:
+            eta = round(max(self.total - self.done, 0) / rate, 1)
+
+        return {
+            'done': self.done,
+            'total': self.total,
+            'failed': self.failed,
+            'rate': round(rate, 2),
+            'elapsed': round(elapsed, 1),
+            'eta': eta,
+        }
 
 
 class ValidationSchema(models.Model):
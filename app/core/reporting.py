@@ -0,0 +1,164 @@
+import time
+
+from core.models import TaskProgress, TaskResultDetail
+from core.status import touch_status_version
+from datetime import datetime
+from django.db.models import F
+from django.utils import timezone
+from spf import settings
+
+
+class ProgressReporter:
+    """
+    Acumula o progresso de uma task e o publica no backend de resultados no máximo a cada
+    TASK_PROGRESS_INTERVAL segundos ou TASK_PROGRESS_EVERY itens processados. Se root_id for informado, o progresso
+    também é somado ao progresso agregado (TaskProgress) da task raiz.
+    """
+    def __init__(self, task, total=None, interval=None, every=None, root_id=None):
+        self.task = task
+        self.total = total
+        self.root_id = root_id
+        self.interval = interval or settings.TASK_PROGRESS_INTERVAL
+        self.every = every or settings.TASK_PROGRESS_EVERY
+
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+        self._last_update = self.started
+        self._last_done = 0
+        self._last_failed = 0
+
+    def add_total(self, n):
+        self.total = (self.total or 0) + n
+
+    def advance(self, n=1, failed=False):
+        self.done += n
+        if failed:
+            self.failed += n
+
+        now = time.monotonic()
+        if now - self._last_update >= self.interval or self.done - self._last_done >= self.every:
+            self.flush(now)
+
+    def meta(self, now=None):
+        elapsed = (now or time.monotonic()) - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0
+
+        eta = None
+        if self.total is not None and rate > 0:
+            eta = round(max(self.total - self.done, 0) / rate, 1)
+
+        return {
+            'done': self.done,
+            'total': self.total,
+            'failed': self.failed,
+            'rate': round(rate, 2),
+            'elapsed': round(elapsed, 1),
+            'eta': eta,
+        }
+
+    def flush(self, now=None):
+        now = now or time.monotonic()
+        self.task.update_state(state='PROGRESS', meta=self.meta(now))
+        touch_status_version()
+
+        if self.root_id and self.done > self._last_done:
+            add_aggregated_progress(self.root_id, done=self.done - self._last_done, failed=self.failed - self._last_failed)
+
+        self._last_update = now
+        self._last_done = self.done
+        self._last_failed = self.failed
+
+
+def start_aggregated_progress(task_id):
+    TaskProgress.objects.get_or_create(task_id=task_id)
+
+
+def add_aggregated_progress(task_id, total=0, done=0, failed=0):
+    # atualização atômica: as tasks que compartilham a mesma raiz são executadas em paralelo
+    TaskProgress.objects.filter(task_id=task_id).update(
+        total=F('total') + total,
+        done=F('done') + done,
+        failed=F('failed') + failed,
+        updated=timezone.now(),
+    )
+
+
+class ResultLog:
+    """
+    Registra o resultado de cada item processado por uma task em TaskResultDetail, em lotes de
+    TASK_RESULT_DETAIL_BUFFER_SIZE registros. Apenas os contadores são mantidos em memória.
+    """
+    def __init__(self, task_id, buffer_size=None):
+        self.task_id = task_id
+        self.buffer_size = buffer_size or settings.TASK_RESULT_DETAIL_BUFFER_SIZE
+
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0
+        self.started = timezone.now()
+
+        self._buffer = []
+
+    def add(self, item, failed=False, message=None):
+        if failed:
+            self.failed += 1
+        else:
+            self.succeeded += 1
+
+        self._buffer.append(TaskResultDetail(
+            task_id=self.task_id,
+            item=str(item)[:255],
+            status=TaskResultDetail.Status.FAILED if failed else TaskResultDetail.Status.COMPLETED,
+            message=message,
+        ))
+
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def skip(self, item):
+        # itens ignorados (por exemplo, documentos já migrados e inalterados) são apenas contados
+        self.skipped += 1
+
+    def flush(self):
+        if self._buffer:
+            TaskResultDetail.objects.bulk_create(self._buffer)
+            self._buffer = []
+
+    def summary(self):
+        self.flush()
+
+        finished = timezone.now()
+
+        return {
+            'task_id': self.task_id,
+            'total': self.succeeded + self.failed + self.skipped,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'started': self.started.isoformat(),
+            'finished': finished.isoformat(),
+            'duration': round((finished - self.started).total_seconds(), 3),
+        }
+
+
+def merge_summaries(summaries):
+    summaries = [s for s in summaries if s]
+
+    if not summaries:
+        return {'total': 0, 'succeeded': 0, 'failed': 0, 'skipped': 0}
+
+    started = min(s['started'] for s in summaries)
+    finished = max(s['finished'] for s in summaries)
+
+    return {
+        'task_id': summaries[0]['task_id'],
+        'total': sum(s['total'] for s in summaries),
+        'succeeded': sum(s['succeeded'] for s in summaries),
+        'failed': sum(s['failed'] for s in summaries),
+        'skipped': sum(s.get('skipped', 0) for s in summaries),
+        'started': started,
+        'finished': finished,
+        'duration': round((datetime.fromisoformat(finished) - datetime.fromisoformat(started)).total_seconds(), 3),
+    }
@@ -70,3 +70,176 @@ function setEventStatusCompleted(object){
     object.classList.remove('bg-warning');
     object.classList.add('bg-success');
 }
+
+function setIngressPackageStatus(object, status){
+    const labels = {
+        'RC': gettext('Received'),
+        'QU': gettext('Queued for uploading'),
+        'UI': gettext('Uploading'),
+        'UF': gettext('Uploading failure'),
+        'UC': gettext('Uploaded'),
+    };
+    const styles = {
+        'RC': 'bg-secondary',
+        'QU': 'bg-secondary',
+        'UI': 'bg-warning',
+        'UF': 'bg-danger',
+        'UC': 'bg-success',
+    };
+
+    object.innerHTML = labels[status] || status;
+    object.classList.remove('bg-secondary', 'bg-warning', 'bg-danger', 'bg-success');
+    object.classList.add(styles[status] || 'bg-secondary');
+}
+
+function isChunkReceived(received, offset, length){
+    for (let i = 0; i < received.length; ++i){
+        if (received[i][0] <= offset && offset + length <= received[i][0] + received[i][1]){
+            return true;
+        }
+    }
+    return false;
+}
+
+function uploadPackage(file, csrf_token, on_progress, on_complete, on_error){
+    // envio em uma única requisição; o servidor encaminha o pacote ao MinIO enquanto o recebe
+    let form_data = new FormData();
+    form_data.append('package_file', file, file.name);
+    form_data.append('csrfmiddlewaretoken', csrf_token);
+
+    $.ajax({
+        type: 'POST',
+        url: '/ingress/package_upload/',
+        data: form_data,
+        dataType: 'json',
+        xhr: function(){
+            const xhr = new window.XMLHttpRequest();
+            xhr.upload.addEventListener('progress', function(e){
+                if (e.lengthComputable){
+                    on_progress(e.loaded, e.total);
+                }
+            });
+            return xhr;
+        },
+        cache: false,
+        contentType: false,
+        processData: false,
+    }).done(on_complete).fail(on_error);
+}
+
+function uploadPackageInChunks(file, csrf_token, on_progress, on_complete, on_error){
+    const url = '/ingress/package_upload/chunk/';
+    const chunk_size = 5 * 1024 * 1024;
+    const parallel_chunks = 3;
+    const max_retries = 3;
+
+    // identificador estável: permite retomar o envio do mesmo arquivo após uma falha de conexão
+    const upload_id = [file.size, file.lastModified, file.name].join('_').replace(/[^A-Za-z0-9_-]/g, '-').substring(0, 64);
+
+    $.post(url, {
+        'action': 'start',
+        'upload_id': upload_id,
+        'package_name': file.name,
+        'total_size': file.size,
+        'csrfmiddlewaretoken': csrf_token,
+    }).done(function(status){
+        let pending = [];
+        for (let offset = 0; offset < file.size; offset += chunk_size){
+            let length = Math.min(chunk_size, file.size - offset);
+            if (!isChunkReceived(status['received'], offset, length)){
+                pending.push(offset);
+            }
+        }
+
+        let uploaded_size = file.size - pending.reduce(function(total, offset){
+            return total + Math.min(chunk_size, file.size - offset);
+        }, 0);
+        let running = 0;
+        let failed = false;
+
+        on_progress(uploaded_size, file.size);
+
+        function complete(){
+            $.post(url, {
+                'action': 'complete',
+                'upload_id': upload_id,
+                'csrfmiddlewaretoken': csrf_token,
+            }).done(on_complete).fail(on_error);
+        }
+
+        function sendChunk(offset, attempt){
+            let form_data = new FormData();
+            form_data.append('action', 'chunk');
+            form_data.append('upload_id', upload_id);
+            form_data.append('offset', offset);
+            form_data.append('chunk', file.slice(offset, offset + chunk_size), file.name);
+            form_data.append('csrfmiddlewaretoken', csrf_token);
+
+            $.ajax({
+                type: 'POST',
+                url: url,
+                data: form_data,
+                cache: false,
+                contentType: false,
+                processData: false,
+            }).done(function(){
+                running -= 1;
+                uploaded_size += Math.min(chunk_size, file.size - offset);
+                on_progress(uploaded_size, file.size);
+                next();
+            }).fail(function(err){
+                if (attempt < max_retries){
+                    sendChunk(offset, attempt + 1);
+                } else if (!failed) {
+                    failed = true;
+                    on_error(err);
+                }
+            });
+        }
+
+        function next(){
+            if (failed){
+                return;
+            }
+            while (running < parallel_chunks && pending.length > 0){
+                running += 1;
+                sendChunk(pending.shift(), 1);
+            }
+            if (running == 0 && pending.length == 0){
+                complete();
+            }
+        }
+
+        next();
+    }).fail(on_error);
+}
+
+function setEventStatusFailed(object){
+    object.innerHTML = gettext('Failed');
+    object.classList.remove('bg-warning');
+    object.classList.add('bg-danger');
+}
+
+function subscribeStatus(events, tasks, on_event, on_task){
+    // estados enviados pelo servidor (SSE); retorna null quando o navegador não oferece suporte
+    if (!window.EventSource){
+        return null;
+    }
+
+    const params = new URLSearchParams();
+    events.forEach(function(e){ params.append('event', e); });
+    tasks.forEach(function(t){ params.append('task', t); });
+
+    const source = new EventSource('/stream/status/?' + params.toString());
+    source.addEventListener('event', function(message){
+        if (on_event) on_event(JSON.parse(message.data));
+    });
+    source.addEventListener('task', function(message){
+        if (on_task) on_task(JSON.parse(message.data));
+    });
+    source.addEventListener('end', function(){
+        source.close();
+    });
+
+    return source;
+}
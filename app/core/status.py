@@ -0,0 +1,34 @@
+"""
+Versão dos estados de eventos e de tasks.
+
+Os processos que alteram eventos ou tasks incrementam a chave STATUS_VERSION_KEY no cache compartilhado; as conexões
+de acompanhamento de estados (core.streams) consultam o banco de dados apenas quando a versão muda.
+"""
+from celery.signals import task_postrun, task_prerun
+from django.core.cache import cache
+
+
+STATUS_VERSION_KEY = 'spf:status_version'
+
+
+def touch_status_version():
+    try:
+        cache.incr(STATUS_VERSION_KEY)
+    except ValueError:
+        # chave inexistente ou removida do cache
+        cache.add(STATUS_VERSION_KEY, 1, None)
+
+
+def get_status_version():
+    return cache.get(STATUS_VERSION_KEY)
+
+
+@task_prerun.connect
+def touch_status_version_on_task_start(**kwargs):
+    touch_status_version()
+
+
+@task_postrun.connect
+def touch_status_version_on_task_end(**kwargs):
+    # o resultado da task já foi gravado no backend de resultados
+    touch_status_version()
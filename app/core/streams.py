@@ -0,0 +1,200 @@
+"""
+Envio de estados de eventos e de tasks aos navegadores por Server-Sent Events (SSE).
+
+GET /stream/status/?event=<id>&event=<id>&task=<task_id>
+
+Cada mudança de estado é enviada como uma mensagem "event" ou "task". A conexão é encerrada quando todos os
+eventos e tasks acompanhados chegam a um estado final, ou após STATUS_STREAM_TIMEOUT segundos (o navegador
+reconecta automaticamente).
+
+Os estados não são consultados periodicamente por conexão: um único observador por processo lê a versão dos estados
+(core.status) a cada STATUS_STREAM_INTERVAL segundos e as conexões consultam o banco de dados apenas quando a versão
+muda, ou a cada STATUS_STREAM_REFRESH segundos.
+"""
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.contrib import auth
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.http import HttpRequest
+from django.http.cookie import parse_cookie
+from importlib import import_module
+from spf import settings
+from urllib.parse import parse_qs
+
+from core import controller
+from core.status import get_status_version
+from core.models import (
+    GROUP_MANAGER,
+    GROUP_OPERATOR_INGRESS,
+    GROUP_OPERATOR_MIGRATION,
+    GROUP_QUALITY_ANALYST,
+    Event,
+)
+
+
+ALLOWED_GROUPS = [GROUP_MANAGER, GROUP_OPERATOR_INGRESS, GROUP_OPERATOR_MIGRATION, GROUP_QUALITY_ANALYST]
+
+EVENT_FINAL_STATUS = [Event.Status.COMPLETED, Event.Status.FAILED]
+
+TASK_FINAL_STATUS = ['SUCCESS', 'FAILURE', 'REVOKED']
+
+
+class StatusVersionWatcher:
+    """
+    Observa a versão dos estados em nome de todas as conexões do processo. A leitura do cache é interrompida quando
+    não há conexões aguardando.
+    """
+    def __init__(self):
+        self.version = None
+        self._waiting = 0
+        self._changed = None
+        self._task = None
+
+    async def _watch(self):
+        while self._waiting:
+            version = await sync_to_async(get_status_version)()
+            if version != self.version:
+                self.version = version
+                self._changed.set()
+                self._changed = asyncio.Event()
+            await asyncio.sleep(settings.STATUS_STREAM_INTERVAL)
+
+    async def wait(self, version, timeout):
+        """Aguarda, por no máximo timeout segundos, uma versão diferente de version."""
+        if self.version != version:
+            return
+
+        if self._changed is None:
+            self._changed = asyncio.Event()
+
+        self._waiting += 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._watch())
+
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._waiting -= 1
+
+
+status_version_watcher = StatusVersionWatcher()
+
+
+def _get_user(session_key):
+    close_old_connections()
+    try:
+        request = HttpRequest()
+        request.session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+
+        user = auth.get_user(request)
+        if user.is_authenticated and (user.is_superuser or set(controller.get_groups_names_from_user(user)) & set(ALLOWED_GROUPS)):
+            return user
+    finally:
+        close_old_connections()
+
+
+def _get_status(user, event_ids, task_ids):
+    # conexões encerradas ou com idade superior a CONN_MAX_AGE não são mantidas entre as consultas
+    close_old_connections()
+    try:
+        events_status = controller.get_events_status(user, event_ids) if event_ids else {}
+        tasks_status = controller.get_tasks_status(task_ids) if task_ids else {}
+        return events_status, tasks_status
+    finally:
+        close_old_connections()
+
+
+async def _send_response(send, status, body=b''):
+    await send({'type': 'http.response.start', 'status': status, 'headers': [(b'content-type', b'text/plain')]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _send_message(send, name, data):
+    message = 'event: %s\ndata: %s\n\n' % (name, json.dumps(data, cls=DjangoJSONEncoder))
+    await send({'type': 'http.response.body', 'body': message.encode(), 'more_body': True})
+
+
+async def status_stream(scope, receive, send):
+    headers = dict(scope['headers'])
+    cookies = parse_cookie(headers.get(b'cookie', b'').decode('latin-1'))
+
+    user = await sync_to_async(_get_user)(cookies.get(settings.SESSION_COOKIE_NAME))
+    if not user:
+        await _send_response(send, 403)
+        return
+
+    params = parse_qs(scope['query_string'].decode())
+    try:
+        event_ids = [int(e) for e in params.get('event', [])]
+    except ValueError:
+        await _send_response(send, 400)
+        return
+    task_ids = params.get('task', [])
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ],
+    })
+
+    disconnected = asyncio.Event()
+
+    async def wait_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    watcher = asyncio.ensure_future(wait_disconnect())
+
+    sent = {}
+    finished = False
+    started = time.monotonic()
+    last_message = started
+
+    try:
+        while not disconnected.is_set() and time.monotonic() - started < settings.STATUS_STREAM_TIMEOUT:
+            version = status_version_watcher.version
+            events_status, tasks_status = await sync_to_async(_get_status)(user, event_ids, task_ids)
+
+            for event_id, status in events_status.items():
+                if sent.get(('event', event_id)) != status:
+                    sent[('event', event_id)] = status
+                    await _send_message(send, 'event', {'id': event_id, 'status': status})
+                    last_message = time.monotonic()
+
+            for task_id, task in tasks_status.items():
+                if sent.get(('task', task_id)) != task:
+                    sent[('task', task_id)] = task
+                    await _send_message(send, 'task', dict(task, id=task_id))
+                    last_message = time.monotonic()
+
+            finished = all(s in EVENT_FINAL_STATUS for s in events_status.values()) and \
+                all(t['status'] in TASK_FINAL_STATUS for t in tasks_status.values())
+            if finished:
+                break
+
+            if time.monotonic() - last_message > 15:
+                # mantém a conexão aberta em proxies
+                await send({'type': 'http.response.body', 'body': b': keep-alive\n\n', 'more_body': True})
+                last_message = time.monotonic()
+
+            # aguarda uma mudança de versão dos estados, o intervalo de atualização ou a desconexão do navegador
+            changed = asyncio.ensure_future(status_version_watcher.wait(version, settings.STATUS_STREAM_REFRESH))
+            await asyncio.wait([changed, watcher], return_when=asyncio.FIRST_COMPLETED)
+            changed.cancel()
+
+        if not disconnected.is_set():
+            # a mensagem "end" indica ao navegador que não deve reconectar
+            await send({'type': 'http.response.body', 'body': b'event: end\ndata: {}\n\n' if finished else b''})
+    finally:
+        watcher.cancel()
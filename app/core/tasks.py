@@ -1,51 +1,102 @@
+from celery import chain, chord
+from django.utils import timezone
+from spf import settings
 from spf.celery import app
-from core import controller, utils
-from core.models import Event, IngressPackage
+from core import controller, isis, utils
+from core.catalog import invalidate_catalog
+from core.metrics import DOCUMENT_MIGRATION_DURATION
+from core.models import Event, IngressPackage, MigrationLedger
+from core.reporting import (
+    ProgressReporter,
+    ResultLog,
+    add_aggregated_progress,
+    merge_summaries,
+    start_aggregated_progress,
+)
+from core.status import touch_status_version
 
 import dsm.ingress as dsm_ingress
 import dsm.migration as dsm_migration
+import itertools
+import os
+import shutil
+import tempfile
+import time
 
 
-@app.task(bind=True,  max_retries=3)
+@app.task(bind=True,  max_retries=3, priority=9)
 def task_get_package_uri_by_pid(self, pid, user_id):
     # obtém objeto User
     user = controller.get_user_from_id(user_id)
 
-    # cria evento de pesquisa por pacote
-    ev = controller.add_event(user, Event.Name.RETRIEVE_PACKAGE, annotation={'pid': pid})
+    # início do evento de pesquisa por pacote
+    started = timezone.now()
 
     # obtém o {uri, name} de todos os pacotes existentes para o PID informado
     result = dsm_ingress.get_package_uri_by_pid(pid)
+    controller.set_cached_package_uri(pid, result)
 
     app.current_task.update_state(state='PROGRESS', meta={'status': 'LOADING...',})
 
     if result['errors']:
-        # houve alguma falha. atualiza status com valor FAILED e conteúdo da falha ocorrida
-        controller.update_event(ev, {'status': Event.Status.FAILED, 'annotation': result,})
+        # houve alguma falha. registra evento com status FAILED e conteúdo da falha ocorrida
+        controller.record_event(user, Event.Name.RETRIEVE_PACKAGE, {'pid': pid, **result}, Event.Status.FAILED, started)
     else:
-        # evento ocorreu com sucesso. atualiza status com valor COMPLETED
-        controller.update_event(ev, {'status': Event.Status.COMPLETED})
+        # evento ocorreu com sucesso. registra evento com status COMPLETED
+        controller.record_event(user, Event.Name.RETRIEVE_PACKAGE, {'pid': pid}, Event.Status.COMPLETED, started)
 
     return result
 
 
 @app.task(bind=True,  max_retries=3)
-def task_ingress_package(self, package_path, package_file, user_id):
+def task_ingress_package(self, package_path, package_file, user_id, ingress_package_id=None, staged=False):
     user = controller.get_user_from_id(user_id)
-    ev = controller.add_event(user, Event.Name.UPLOAD_PACKAGE_TO_MINIO, {'package_file': package_file}, Event.Status.INITIATED)
+    started = timezone.now()
+
+    # obtém o pacote registrado no momento do recebimento (ou o registra, caso a task seja chamada diretamente)
+    if ingress_package_id:
+        ip = controller.get_ingress_package_from_id(ingress_package_id)
+    else:
+        ip = controller.add_ingress_package(user, started, package_file, IngressPackage.Status.RECEIVED)
+
+    controller.update_ingress_package_status(ip, IngressPackage.Status.UPLOADING)
+    self.update_state(state='PROGRESS', meta={'ingress_package_id': ip.id, 'status': ip.status})
+    touch_status_version()
 
     results = {}
+    local_path = package_path
 
     try:
-        results.update(dsm_ingress.upload_package(package_path))
-        controller.update_event(ev, {'status': Event.Status.COMPLETED})
-        controller.add_ingress_package(user, ev.datetime, package_file, IngressPackage.Status.RECEIVED)
+        if staged:
+            # pacote recebido em modo streaming (package_path é o nome do objeto no MinIO)
+            local_path = utils.fetch_staged_package(package_path)
+
+        results.update(dsm_ingress.upload_package(local_path))
+
+        # as consultas de pacotes em cache dos documentos do pacote deixam de ser válidas
+        controller.invalidate_cached_package_uri(utils.get_package_pids(local_path))
+
+        controller.record_event(user, Event.Name.UPLOAD_PACKAGE_TO_MINIO, {'package_file': package_file}, Event.Status.COMPLETED, started)
+        controller.update_ingress_package_status(ip, IngressPackage.Status.UPLOADED)
     except ValueError as e:
-        controller.update_event(ev, {'status': Event.Status.FAILED, 'annotation': {'error': str(e)},})
+        controller.record_event(user, Event.Name.UPLOAD_PACKAGE_TO_MINIO, {'package_file': package_file, 'error': str(e)}, Event.Status.FAILED, started)
+        controller.update_ingress_package_status(ip, IngressPackage.Status.UPLOADING_FAILURE)
         results.update({'error': str(e)})
+    except Exception:
+        # falha inesperada: o pacote não pode permanecer indefinidamente no estado UPLOADING
+        controller.record_event(user, Event.Name.UPLOAD_PACKAGE_TO_MINIO, {'package_file': package_file}, Event.Status.FAILED, started)
+        controller.update_ingress_package_status(ip, IngressPackage.Status.UPLOADING_FAILURE)
+        raise
+    finally:
+        if staged:
+            utils.delete_staged_package(package_path)
+            if local_path != package_path:
+                shutil.rmtree(os.path.dirname(local_path), ignore_errors=True)
+        else:
+            utils.delete_file_path(package_path)
+
+    results.update({'ingress_package_id': ip.id, 'status': ip.status})
 
-    utils.fs_delete_file(package_path)
-    
     return results
 
 
@@ -53,71 +104,305 @@ def task_ingress_package(self, package_path, package_file, user_id):
 def task_migrate_identify_documents(self):
     app.current_task.update_state(state='PROGRESS', meta={'status': 'LOADING...'})
 
-    results = []
+    log = ResultLog(self.request.id)
     for i in dsm_migration.identify_documents_to_migrate():
-        results.append(i)
+        log.add(i)
 
-    return results
+    return log.summary()
 
 
 @app.task(bind=True,  max_retries=3)
 def task_migrate_isis_db(self, data_type, file_path, file_id=None):
-   results = []
+    log = ResultLog(self.request.id)
+    progress = ProgressReporter(self, total=_count_records(file_path))
+
+    records = _migrate_isis_db(data_type, file_path, log, progress)
+
+    if file_id:
+        utils.fs_delete_file(file_id)
 
-   if file_id:
-       for r in dsm_migration.migrate_isis_db(data_type, file_path):
-            app.current_task.update_state(state='PROGRESS', meta={'status': 'LOADING...', })
-            results.append(r)
-       utils.fs_delete_file(file_id)
-   else:
-       for r in dsm_migration.migrate_isis_db(data_type, file_path):
-           app.current_task.update_state(state='PROGRESS', meta={'status': 'LOADING...',})
-           results.append(r)
+    invalidate_catalog()
 
-   return results
+    return _add_records_rate(log.summary(), records)
 
 
 @app.task(bind=True,  max_retries=3)
-def task_migrate_acron(self, acronym):
-    results = []
+def task_migrate_isis_db_sharded(self, data_type, path, event_id=None):
+    """
+    Divide um arquivo id (ou uma base ISIS, exportada com o i2id) em ISIS_MIGRATION_SHARDS intervalos de registros
+    e migra cada intervalo em uma task distinta. O resultado consolidado atualiza o evento event_id.
+    """
+    shards_dir = tempfile.mkdtemp(dir=settings.MEDIA_INGRESS_TEMP)
 
-    if acronym:
-        acron = acronym.split(",")
-        for a in acron:
-            for r in dsm_migration.migrate_acron(a):
-                app.current_task.update_state(state='PROGRESS', meta={'status': 'LOADING...',})
-                results.append('Finish ' + a)
+    try:
+        id_path = path
+        if not path.endswith('.id'):
+            id_path = isis.export_isis_base(path, os.path.join(shards_dir, f'{data_type}.id'))
 
-    return results
+        # o progresso das partes é agregado sob o identificador desta task
+        start_aggregated_progress(self.request.id)
+        add_aggregated_progress(self.request.id, total=isis.count_id_file_records(id_path))
+
+        shards = isis.split_id_file(id_path, settings.ISIS_MIGRATION_SHARDS, shards_dir, data_type)
+
+        if id_path != path:
+            os.remove(id_path)
+    except Exception as e:
+        # falha na exportação (por exemplo, i2id indisponível) ou na divisão: nenhuma parte é migrada
+        shutil.rmtree(shards_dir, ignore_errors=True)
+
+        if event_id:
+            event = controller.get_event_from_id(event_id)
+            controller.update_event(event, {
+                'status': Event.Status.FAILED,
+                'annotation': dict(event.annotation or {}, error=str(e)),
+            })
+        raise
+
+    if not shards:
+        return task_migrate_isis_db_summary([], shards_dir, event_id)
+
+    result = chord(
+        task_migrate_isis_db_shard.s(data_type, s) for s in shards
+    )(task_migrate_isis_db_summary.s(shards_dir, event_id).on_error(task_migrate_isis_db_failure.s(shards_dir, event_id)))
+
+    # o detalhamento por registro é registrado pelas partes sob o identificador desta task
+    return {
+        'task_id': self.request.id,
+        'shards': len(shards),
+        'result_id': result.id,
+    }
+
+
+@app.task(bind=True,  max_retries=3, priority=3)
+def task_migrate_isis_db_shard(self, data_type, shard_path):
+    log = ResultLog(self.request.root_id or self.request.id)
+    progress = ProgressReporter(self, total=isis.count_id_file_records(shard_path), root_id=self.request.root_id)
+
+    records = _migrate_isis_db(data_type, shard_path, log, progress)
+    progress.flush()
+
+    os.remove(shard_path)
+
+    return _add_records_rate(log.summary(), records)
+
+
+@app.task(priority=7)
+def task_migrate_isis_db_summary(shards_results, shards_dir, event_id=None):
+    shutil.rmtree(shards_dir, ignore_errors=True)
+    invalidate_catalog()
+
+    summary = merge_summaries(shards_results)
+    if shards_results and all(r.get('records') is not None for r in shards_results):
+        summary = _add_records_rate(summary, sum(r['records'] for r in shards_results))
+
+    if event_id:
+        status = Event.Status.FAILED if summary['failed'] else Event.Status.COMPLETED
+        controller.update_event(controller.get_event_from_id(event_id), {'status': status})
+
+    return summary
+
+
+@app.task(priority=7)
+def task_migrate_isis_db_failure(request, exc, traceback, shards_dir, event_id=None):
+    shutil.rmtree(shards_dir, ignore_errors=True)
+
+    if event_id:
+        controller.update_event(controller.get_event_from_id(event_id), {'status': Event.Status.FAILED})
+
+
+def _migrate_isis_db(data_type, file_path, log, progress):
+    # arquivos id são lidos incrementalmente e migrados em partes de ISIS_MIGRATION_CHUNK_SIZE registros
+    if settings.ISIS_MIGRATION_CHUNK_SIZE and file_path.endswith('.id'):
+        return _migrate_id_file_in_chunks(data_type, file_path, log, progress)
+
+    for r in dsm_migration.migrate_isis_db(data_type, file_path):
+        log.add(r)
+        progress.advance()
+
+
+def _count_records(file_path):
+    # apenas arquivos id podem ser contados sem a leitura da base pelo dsm
+    if file_path.endswith('.id'):
+        return isis.count_id_file_records(file_path)
+
+
+def _add_records_rate(summary, records):
+    if records is not None:
+        summary['records'] = records
+        summary['records_per_second'] = round(records / summary['duration'], 2) if summary['duration'] else None
+
+    return summary
+
+
+def _migrate_id_file_in_chunks(data_type, file_path, log, progress):
+    records = 0
+
+    with tempfile.TemporaryDirectory(dir=settings.MEDIA_INGRESS_TEMP) as tmp_dir:
+        chunk_path = os.path.join(tmp_dir, os.path.basename(file_path))
+
+        for chunk in isis.iter_id_file_chunks(file_path, settings.ISIS_MIGRATION_CHUNK_SIZE, data_type):
+            isis.write_id_file(chunk, chunk_path)
+            records += len(chunk)
+
+            for r in dsm_migration.migrate_isis_db(data_type, chunk_path):
+                log.add(r)
+                progress.advance()
+
+    return records
 
 
 @app.task(bind=True,  max_retries=3)
-def task_migrate_documents(self, acronym=None, volume=None, pub_year=None, pid=None):
-    results = None
+def task_migrate_acron(self, acronym):
+    acron = acronym.split(",") if acronym else []
+
+    log = ResultLog(self.request.id)
+    # o progresso é contado por acrônimo, a única quantidade conhecida antes da migração
+    progress = ProgressReporter(self, total=len(acron))
+
+    for a in acron:
+        for r in dsm_migration.migrate_acron(a):
+            log.add(a, message=str(r))
+        progress.advance()
+
+    invalidate_catalog()
+
+    return log.summary()
+
+
+def _split_in_lanes(pids, batch_size, concurrency):
+    batches = [pids[i:i + batch_size] for i in range(0, len(pids), batch_size)]
+    return [batches[i::concurrency] for i in range(min(concurrency, len(batches)))]
+
+
+def _get_sources_to_migrate(volume, pub_year, pid):
+    sources = []
 
     if pid:
-        results = []
-        for p in pid.split(","):
-            for r in dsm_migration.migrate_document(p):
-                app.current_task.update_state(state='PROGRESS', meta={'status': 'LOADING...',})
-                results.append('Finish ' + str(p))
+        sources.append(['pid', [p for p in pid.split(",") if p]])
 
     if volume:
-        results = []
-        for v in volume.split(","):
-            total_documents = dsm_migration.list_documents_to_migrate(acronym, v, "", "", "", items_per_page=1000000, page_number=1, status="")
-            for d in total_documents:
-                for r in dsm_migration.migrate_document(d):
-                    app.current_task.update_state(state='PROGRESS', meta={'status': 'LOADING...',})
-                    results.append('Finish ' + str(d))
+        sources.extend(['volume', v] for v in volume.split(","))
 
     if pub_year:
-        results = []
-        for y in pub_year.split(","):
-            total_documents = dsm_migration.list_documents_to_migrate(acronym, "", y, "", "", items_per_page=1000000, page_number=1, status="")
-            for d in total_documents:
-                for r in dsm_migration.migrate_document(d):
-                    app.current_task.update_state(state='PROGRESS', meta={'status': 'LOADING...',})
-                    results.append('Finish ' + str(d))
+        sources.extend(['pub_year', y] for y in pub_year.split(","))
 
-    return results
+    return sources
+
+
+def _iter_pids_to_migrate(acronym, sources, after=None):
+    """
+    Percorre, em ordem de PID, os identificadores de cada fonte (lista de PIDs, volume ou ano), a partir do PID after
+    da primeira fonte. Cada identificador é acompanhado das fontes ainda não concluídas: com ele, formam o cursor que
+    permite retomar o percurso.
+    """
+    for i, (kind, value) in enumerate(sources):
+        if kind == 'pid':
+            pids = (p for p in sorted(value) if not after or p > after)
+        else:
+            # os documentos são obtidos em páginas de MIGRATION_LIST_PAGE_SIZE; apenas os identificadores são repassados
+            volume, pub_year = (value, "") if kind == 'volume' else ("", value)
+            pids = (d.id for d in controller.iter_documents_to_migrate(acronym, volume, pub_year, after=after))
+
+        for p in pids:
+            yield sources[i:], p
+
+        after = None
+
+
+def _dispatch_documents_page(root_id, acronym, sources, after, force, summary=None):
+    """
+    Despacha a próxima página (MIGRATION_LIST_PAGE_SIZE identificadores) a partir do cursor (sources, after). A página
+    seguinte é despachada apenas pelo callback do chord desta, de modo que no máximo MIGRATION_CONCURRENCY lotes são
+    executados simultaneamente em toda a migração. Sem documentos restantes, retorna o resumo acumulado.
+    """
+    page = list(itertools.islice(_iter_pids_to_migrate(acronym, sources, after), settings.MIGRATION_LIST_PAGE_SIZE))
+
+    if not page:
+        invalidate_catalog()
+        return summary or merge_summaries([])
+
+    pids = [p for _, p in page]
+    sources, after = page[-1]
+
+    # os lotes da página são distribuídos em no máximo MIGRATION_CONCURRENCY filas (chains) executadas em paralelo
+    lanes = []
+    for lane in _split_in_lanes(pids, settings.MIGRATION_BATCH_SIZE, settings.MIGRATION_CONCURRENCY):
+        first, *others = lane
+        lanes.append(chain(
+            task_migrate_documents_batch.s(None, first, force),
+            *[task_migrate_documents_batch.s(b, force) for b in others]
+        ))
+
+    add_aggregated_progress(root_id, total=len(pids))
+    result = chord(lanes)(task_migrate_documents_page.s(summary, root_id, acronym, sources, after, force))
+
+    # o detalhamento por documento é registrado pelos lotes sob o identificador da task inicial
+    return {
+        'task_id': root_id,
+        'documents': len(pids),
+        'batches': sum(len(lane.tasks) for lane in lanes),
+        'result_id': result.id,
+    }
+
+
+@app.task(bind=True,  max_retries=3)
+def task_migrate_documents(self, acronym=None, volume=None, pub_year=None, pid=None, force=False):
+    # o progresso dos lotes é agregado sob o identificador desta task; o total cresce a cada página despachada
+    start_aggregated_progress(self.request.id)
+
+    # no máximo MIGRATION_LIST_PAGE_SIZE identificadores são mantidos em memória; as páginas são despachadas em sequência
+    return _dispatch_documents_page(self.request.id, acronym, _get_sources_to_migrate(volume, pub_year, pid), None, force)
+
+
+@app.task(bind=True,  max_retries=3, priority=3)
+def task_migrate_documents_batch(self, previous, pids, force=False):
+    log = ResultLog(self.request.root_id or self.request.id)
+    progress = ProgressReporter(self, total=len(pids), root_id=self.request.root_id)
+
+    # situação de migração e impressão digital de origem do lote, obtidas em uma consulta cada
+    ledger = controller.get_migration_ledger(pids)
+    fingerprints = controller.get_documents_fingerprints(pids)
+    entries = []
+
+    for p in pids:
+        # documentos já migrados e inalterados na origem são ignorados, o que permite retomar uma migração interrompida
+        if not force and controller.is_document_migrated(ledger.get(p), fingerprints.get(p)):
+            log.skip(p)
+            progress.advance()
+            continue
+
+        started = time.monotonic()
+        try:
+            for r in dsm_migration.migrate_document(p):
+                pass
+            status = MigrationLedger.Status.COMPLETED
+            log.add(p)
+            progress.advance()
+        except Exception as e:
+            status = MigrationLedger.Status.FAILED
+            log.add(p, failed=True, message=str(e))
+            progress.advance(failed=True)
+
+        duration = time.monotonic() - started
+        DOCUMENT_MIGRATION_DURATION.labels(status=status.name).observe(duration)
+
+        entries.append(MigrationLedger(
+            pid=p,
+            fingerprint=fingerprints.get(p),
+            status=status,
+            last_run=timezone.now(),
+            duration=round(duration, 3),
+            task_id=self.request.id,
+        ))
+
+    controller.save_migration_ledger(ledger, entries)
+    progress.flush()
+
+    return merge_summaries([previous, log.summary()])
+
+
+@app.task(priority=7)
+def task_migrate_documents_page(lanes_results, summary, root_id, acronym, sources, after, force=False):
+    # callback do chord de uma página: acumula o resumo e despacha a página seguinte
+    return _dispatch_documents_page(root_id, acronym, sources, after, force, merge_summaries([summary] + lanes_results))
@@ -1,5 +1,5 @@
+from core.controller import user_has_group
 from django import template
-from django.contrib.auth.models import Group
 from django.utils.translation import gettext as _
 from dateutil import parser
 
@@ -9,8 +9,8 @@ register = template.Library()
 
 @register.filter(name='has_group')
 def has_group(user, group):
-    group = Group.objects.get(name=group)
-    return group in user.groups.all()
+    # group pode ser o nome do grupo ou um objeto Group
+    return user_has_group(user, getattr(group, 'name', group))
 
 
 @register.filter(name='to_datetime')
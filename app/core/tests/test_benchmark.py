@@ -0,0 +1,31 @@
+from django.test import TestCase
+from unittest import mock
+
+from core.management.commands import benchmark
+
+
+class MeasureTest(TestCase):
+    def test_time_and_memory_are_measured_in_separate_runs(self):
+        calls = []
+
+        def prepare():
+            calls.append('prepare')
+
+        def run():
+            calls.append('run')
+            return {'failed': 0}
+
+        with mock.patch.object(benchmark.tracemalloc, 'start', side_effect=lambda: calls.append('tracemalloc')):
+            measurement = benchmark.measure('ingress', 10, run, prepare)
+
+        self.assertEqual(calls, ['prepare', 'run', 'prepare', 'tracemalloc', 'run'])
+        self.assertEqual(measurement['result'], {'failed': 0})
+        self.assertEqual(measurement['items'], 10)
+
+    def test_compare_reports_regressions_beyond_tolerance(self):
+        baseline = {'throughput': 100, 'peak_memory_mb': 10, 'sql_queries': 10, 'mongo_commands': 0}
+        measurement = {'throughput': 85, 'peak_memory_mb': 11, 'sql_queries': 13, 'mongo_commands': 5}
+
+        regressions = benchmark.compare(measurement, baseline, 0.2)
+
+        self.assertEqual(regressions, ['sql_queries 13 > 10'])
@@ -0,0 +1,302 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import Group, User
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from django_celery_results.models import TaskResult
+from dsm.extdeps.isis_migration.migration_models import ISISDocument
+from mongoengine import QuerySet
+from unittest import mock
+
+from core import controller
+from core.models import Event
+
+
+class StatusVersionTagTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('operator')
+        self.event = controller.add_event(self.user, Event.Name.UPLOAD_PACKAGE_TO_DISK)
+
+    def tag(self, task_ids=()):
+        return controller.get_status_version_tag(self.user, [self.event.id], list(task_ids))
+
+    def test_tag_is_stable_while_nothing_changes(self):
+        self.assertEqual(self.tag(['t1']), self.tag(['t1']))
+
+    def test_tag_changes_when_event_finishes(self):
+        before = self.tag()
+        controller.update_event(self.event, {'status': Event.Status.COMPLETED})
+
+        self.assertNotEqual(self.tag(), before)
+
+    def test_tag_changes_when_task_result_is_stored(self):
+        before = self.tag(['t1'])
+        TaskResult.objects.store_result('application/json', 'utf-8', 't1', '{"done": 1}', 'PROGRESS')
+        stored = self.tag(['t1'])
+        TaskResult.objects.store_result('application/json', 'utf-8', 't1', '{"done": 2}', 'SUCCESS')
+
+        self.assertNotEqual(stored, before)
+        self.assertNotEqual(self.tag(['t1']), stored)
+
+    def test_tag_depends_on_requested_ids(self):
+        self.assertNotEqual(self.tag(['t1']), self.tag(['t2']))
+
+    def test_events_of_other_users_are_ignored(self):
+        other_event = controller.add_event(User.objects.create_user('other'), Event.Name.UPLOAD_PACKAGE_TO_DISK)
+        event_ids = [self.event.id, other_event.id]
+
+        before = controller.get_status_version_tag(self.user, event_ids, [])
+        controller.update_event(other_event, {'status': Event.Status.COMPLETED})
+
+        self.assertEqual(controller.get_status_version_tag(self.user, event_ids, []), before)
+
+
+class DatetimeKeysetPaginationTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('operator')
+        now = timezone.now()
+
+        # dois eventos com o mesmo datetime: a ordem é desempatada pelo id
+        self.events = [
+            Event.objects.create(user=user, name=Event.Name.RETRIEVE_PACKAGE, status=Event.Status.COMPLETED, datetime=now - timedelta(minutes=m))
+            for m in (0, 1, 1, 2, 3)
+        ]
+        self.expected = sorted(self.events, key=lambda e: (e.datetime, e.id), reverse=True)
+
+    def paginate(self, **kwargs):
+        return controller.paginate_by_datetime_keyset(Event.objects.all(), items_per_page=2, **kwargs)
+
+    def test_pages_forward_and_backward(self):
+        first = self.paginate()
+        second = self.paginate(after=first.next_cursor)
+        third = self.paginate(after=second.next_cursor)
+
+        self.assertEqual(list(first) + list(second) + list(third), self.expected)
+        self.assertEqual((first.has_previous(), first.has_next()), (False, True))
+        self.assertEqual((second.has_previous(), second.has_next()), (True, True))
+        self.assertEqual((third.has_previous(), third.has_next()), (True, False))
+
+        self.assertEqual(list(self.paginate(before=third.previous_cursor)), list(second))
+        self.assertEqual(list(self.paginate(before=second.previous_cursor)), list(first))
+        self.assertFalse(self.paginate(before=second.previous_cursor).has_previous())
+
+    def test_last_page(self):
+        last = self.paginate(last=True)
+
+        self.assertEqual(list(last), self.expected[-2:])
+        self.assertEqual((last.has_previous(), last.has_next()), (True, False))
+
+    def test_invalid_cursor_returns_first_page(self):
+        self.assertEqual(list(self.paginate(after='invalid')), self.expected[:2])
+
+
+class FilterEventsTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('operator')
+
+        def create(name, status, annotation):
+            return Event.objects.create(user=user, name=name, status=status, annotation=annotation)
+
+        self.lookup = create(Event.Name.RETRIEVE_PACKAGE, Event.Status.COMPLETED, {'pid': 'S0034-89102014000200001'})
+        self.failed_lookup = create(Event.Name.RETRIEVE_PACKAGE, Event.Status.FAILED, {'pid': 'S0034-89102014000200002', 'errors': ['not found']})
+        self.upload = create(Event.Name.UPLOAD_PACKAGE_TO_DISK, Event.Status.COMPLETED, {'file_name': 'package.zip'})
+        self.ingress = create(Event.Name.UPLOAD_PACKAGE_TO_MINIO, Event.Status.COMPLETED, {'package_file': 'package.zip'})
+        self.failed_ingress = create(Event.Name.UPLOAD_PACKAGE_TO_MINIO, Event.Status.FAILED, {'package_file': 'other.zip', 'error': 'invalid package'})
+
+    def filter(self, **kwargs):
+        return set(controller.filter_events(Event.objects.all(), **kwargs))
+
+    def test_filter_by_pid(self):
+        self.assertEqual(self.filter(pid='S0034-89102014000200002'), {self.failed_lookup})
+        self.assertEqual(self.filter(pid='S0034'), set())
+
+    def test_filter_by_package(self):
+        self.assertEqual(self.filter(package='package.zip'), {self.upload, self.ingress})
+        self.assertEqual(self.filter(package='other.zip'), {self.failed_ingress})
+
+    def test_filter_by_status_and_name(self):
+        self.assertEqual(self.filter(status=Event.Status.FAILED), {self.failed_lookup, self.failed_ingress})
+        self.assertEqual(self.filter(name=Event.Name.RETRIEVE_PACKAGE, status=Event.Status.COMPLETED), {self.lookup})
+
+
+class FakeDocuments:
+    """QuerySet mínimo (mongoengine) sobre uma lista de PIDs: filter por pk, order_by, limit e count."""
+    def __init__(self, pids):
+        self.pids = list(pids)
+        self.queries = []
+
+    def _clone(self, pids):
+        clone = FakeDocuments(pids)
+        clone.queries = self.queries
+        return clone
+
+    def filter(self, pk__gt=None, pk__lt=None):
+        return self._clone([p for p in self.pids if (pk__gt is None or p > pk__gt) and (pk__lt is None or p < pk__lt)])
+
+    def order_by(self, key):
+        return self._clone(sorted(self.pids, reverse=key.startswith('-')))
+
+    def limit(self, n):
+        self.queries.append(n)
+        return self._clone(self.pids[:n])
+
+    def count(self):
+        return len(self.pids)
+
+    def __iter__(self):
+        return iter(mock.Mock(pk=p) for p in self.pids)
+
+
+class DocumentsKeysetPaginationTest(SimpleTestCase):
+    def setUp(self):
+        self.documents = FakeDocuments(['S%04d' % i for i in (4, 1, 7, 2, 6, 3, 5)])
+
+    def pks(self, page):
+        return [d.pk for d in page]
+
+    def test_first_page(self):
+        page = controller.paginate_documents_by_keyset(self.documents, items_per_page=3)
+
+        self.assertEqual(self.pks(page), ['S0001', 'S0002', 'S0003'])
+        self.assertFalse(page.has_previous())
+        self.assertTrue(page.has_next())
+
+    def test_next_page_starts_after_cursor(self):
+        page = controller.paginate_documents_by_keyset(self.documents, after='S0006', items_per_page=3)
+
+        self.assertEqual(self.pks(page), ['S0007'])
+        self.assertTrue(page.has_previous())
+        self.assertFalse(page.has_next())
+
+    def test_previous_page_ends_before_cursor(self):
+        page = controller.paginate_documents_by_keyset(self.documents, before='S0003', items_per_page=3)
+
+        self.assertEqual(self.pks(page), ['S0001', 'S0002'])
+        self.assertFalse(page.has_previous())
+        self.assertTrue(page.has_next())
+
+    def test_last_page(self):
+        page = controller.paginate_documents_by_keyset(self.documents, last=True, items_per_page=3)
+
+        self.assertEqual(self.pks(page), ['S0005', 'S0006', 'S0007'])
+        self.assertTrue(page.has_previous())
+        self.assertFalse(page.has_next())
+
+    def test_fetches_one_extra_document_only(self):
+        controller.paginate_documents_by_keyset(self.documents, after='S0002', items_per_page=3)
+
+        self.assertEqual(self.documents.queries, [4])
+
+
+class GetDocumentsToMigrateTest(SimpleTestCase):
+    @mock.patch('core.controller.dsm_migration')
+    def test_removes_pagination_requested_to_dsm(self, dsm_migration):
+        dsm_migration.list_documents_to_migrate.return_value = QuerySet(ISISDocument, None).skip(10).limit(1)
+
+        documents = controller.get_documents_to_migrate('abc', '10', '')
+
+        self.assertEqual((documents._skip, documents._limit), (0, 0))
+
+    @mock.patch('core.controller.dsm_migration')
+    def test_rejects_result_that_is_not_a_queryset(self, dsm_migration):
+        dsm_migration.list_documents_to_migrate.return_value = []
+
+        with self.assertRaises(controller.DocumentsQueryError):
+            controller.get_documents_to_migrate('abc', '10', '')
+
+
+class IterDocumentsToMigrateTest(SimpleTestCase):
+    def setUp(self):
+        self.documents = FakeDocuments(['S%04d' % i for i in (4, 1, 7, 2, 6, 3, 5)])
+        patcher = mock.patch('core.controller.get_documents_to_migrate', return_value=self.documents)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_iterates_all_documents_in_pid_order(self):
+        pids = [d.pk for d in controller.iter_documents_to_migrate('abc', '10', '', items_per_page=3)]
+
+        self.assertEqual(pids, ['S%04d' % i for i in range(1, 8)])
+        self.assertEqual(self.documents.queries, [4, 4, 4])
+
+    def test_resumes_after_pid(self):
+        pids = [d.pk for d in controller.iter_documents_to_migrate('abc', '10', '', items_per_page=3, after='S0005')]
+
+        self.assertEqual(pids, ['S0006', 'S0007'])
+
+
+class SearchISISDocumentsTest(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch('core.controller.ISISDocument')
+        self.isis_document = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def filter_kwargs(self):
+        return self.isis_document.objects.filter.call_args[1]
+
+    def test_pid_v2_prefix(self):
+        self.assertEqual(controller.get_pid_v2_prefix('0001-3765'), 'S0001-3765')
+        self.assertEqual(controller.get_pid_v2_prefix(' 00013765 ', '2020'), 'S0001-37652020')
+        self.assertEqual(controller.get_pid_v2_prefix('0001-3765', '2020', '5'), 'S0001-376520200005')
+
+    def test_pid_v2_prefix_rejects_issue_order_without_year(self):
+        with self.assertRaises(controller.DocumentsQueryError):
+            controller.get_pid_v2_prefix('0001-3765', issue_order='5')
+
+    def test_search_by_pid_adds_missing_s(self):
+        controller.search_isis_documents(pid='0001-37652020000500001')
+
+        self.assertEqual(self.filter_kwargs(), {'pk__startswith': 'S0001-37652020000500001'})
+
+    def test_search_by_issn_uses_prefix(self):
+        controller.search_isis_documents(issn='0001-3765', year='2020', issue_order='5')
+
+        self.assertEqual(self.filter_kwargs(), {'pk__startswith': 'S0001-376520200005'})
+
+    def test_search_by_year_without_issn(self):
+        controller.search_isis_documents(year='2020', issue_order='5')
+
+        self.assertEqual(self.filter_kwargs(), {'__raw__': {'_id': {'$regex': '^S.{9}20200005'}}})
+
+    def test_search_rejects_issue_order_without_year(self):
+        with self.assertRaises(controller.DocumentsQueryError):
+            controller.search_isis_documents(issn='0001-3765', issue_order='5')
+
+
+class UpdateUsersGroupsTest(TestCase):
+    def setUp(self):
+        for name in ('manager', 'operator_ingress', 'operator_migration'):
+            Group.objects.create(name=name)
+
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        self.alice.groups.add(Group.objects.get(name='manager'))
+        self.bob.groups.add(Group.objects.get(name='operator_ingress'))
+
+    def groups_names(self, user):
+        return sorted(user.groups.values_list('name', flat=True))
+
+    def test_applies_only_differences(self):
+        controller.update_users_groups({
+            self.alice: ['manager', 'operator_migration'],
+            self.bob: [],
+        })
+
+        self.assertEqual(self.groups_names(self.alice), ['manager', 'operator_migration'])
+        self.assertEqual(self.groups_names(self.bob), [])
+
+    def test_ignores_unknown_groups(self):
+        controller.update_user_groups(self.bob, Group.objects.filter(name='operator_migration'))
+        controller.update_users_groups({self.alice: ['unknown']})
+
+        self.assertEqual(self.groups_names(self.alice), [])
+        self.assertEqual(self.groups_names(self.bob), ['operator_migration'])
+
+    def test_invalidates_groups_names_of_changed_users(self):
+        self.assertEqual(controller.get_groups_names_from_user(self.alice), ['manager'])
+        self.assertEqual(controller.get_groups_names_from_user(self.bob), ['operator_ingress'])
+
+        controller.update_users_groups({self.alice: ['operator_ingress'], self.bob: ['operator_ingress']})
+
+        self.assertEqual(controller.get_groups_names_from_user(self.alice), ['operator_ingress'])
+        # bob não foi alterado: os nomes de grupos já obtidos são mantidos
+        self.assertTrue(hasattr(self.bob, '_groups_names'))
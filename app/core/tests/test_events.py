@@ -0,0 +1,51 @@
+import threading
+
+from django.test import SimpleTestCase
+from unittest import mock
+
+from core.events import EventSink
+
+
+class EventSinkTest(SimpleTestCase):
+    def setUp(self):
+        self.written = []
+        self.flushed = threading.Event()
+
+        def bulk_create(events):
+            self.written.append(list(events))
+            self.flushed.set()
+
+        patcher = mock.patch('core.events.Event.objects.bulk_create', side_effect=bulk_create)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_events_are_kept_until_buffer_is_full(self):
+        sink = EventSink(buffer_size=3, timeout=60)
+        self.addCleanup(sink.flush)
+
+        sink.add('e1')
+        sink.add('e2')
+        self.assertEqual(self.written, [])
+
+        sink.add('e3')
+        self.assertEqual(self.written, [['e1', 'e2', 'e3']])
+
+    def test_events_are_written_after_timeout(self):
+        sink = EventSink(buffer_size=100, timeout=0.05)
+
+        with mock.patch('core.events.connection'):
+            sink.add('e1')
+            sink.add('e2')
+            self.assertTrue(self.flushed.wait(2))
+
+        self.assertEqual(self.written, [['e1', 'e2']])
+        self.assertIsNone(sink._timer)
+
+    def test_flush_cancels_timer(self):
+        sink = EventSink(buffer_size=100, timeout=60)
+
+        sink.add('e1')
+        sink.flush()
+
+        self.assertEqual(self.written, [['e1']])
+        self.assertIsNone(sink._timer)
@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+from unittest import mock
+
+from core import isis
+from spf import settings
+
+
+def record(mfn, pid):
+    return [b'!ID %07d\n' % mfn, b'!v880!%s\n' % pid, b'!v012!Title\n']
+
+
+class IdFileTest(SimpleTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, True)
+
+        # três registros do documento A, dois do documento B e um do documento C
+        self.records = [record(i + 1, pid) for i, pid in enumerate([b'A', b'A', b'A', b'B', b'B', b'C'])]
+        self.path = os.path.join(self.tmp_dir, 'artigo.id')
+        isis.write_id_file(self.records, self.path)
+
+    def read(self, path):
+        return list(isis.iter_id_file_records(path))
+
+    def test_records_are_read_one_by_one(self):
+        self.assertEqual(self.read(self.path), self.records)
+        self.assertEqual(isis.count_id_file_records(self.path), 6)
+
+    def test_last_line_without_newline(self):
+        with open(self.path, 'ab') as fout:
+            fout.write(b'!ID 0000007\n!v880!D')
+
+        self.assertEqual(self.read(self.path)[-1], [b'!ID 0000007\n', b'!v880!D\n'])
+
+    def test_chunks_keep_records_of_a_document_together(self):
+        chunks = list(isis.iter_id_file_chunks(self.path, 2, 'artigo'))
+
+        self.assertEqual([len(c) for c in chunks], [3, 2, 1])
+        self.assertEqual(sum(chunks, []), self.records)
+
+    def test_chunks_without_data_type_have_fixed_size(self):
+        chunks = list(isis.iter_id_file_chunks(self.path, 2))
+
+        self.assertEqual([len(c) for c in chunks], [2, 2, 2])
+
+    def test_split_keeps_records_of_a_document_together(self):
+        paths = isis.split_id_file(self.path, 3, self.tmp_dir, 'artigo')
+
+        self.assertEqual([os.path.basename(p) for p in paths], ['artigo_001.id', 'artigo_002.id', 'artigo_003.id'])
+        self.assertEqual([len(self.read(p)) for p in paths], [3, 2, 1])
+        self.assertEqual(sum((self.read(p) for p in paths), []), self.records)
+
+    def test_split_in_more_parts_than_records(self):
+        paths = isis.split_id_file(self.path, 10, self.tmp_dir)
+
+        self.assertEqual(len(paths), 6)
+
+
+class I2idTest(SimpleTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, True)
+
+    def test_missing_i2id_raises_clear_error(self):
+        with mock.patch.object(settings, 'CISIS_PATH', self.tmp_dir):
+            with self.assertRaises(isis.CISISNotFoundError):
+                isis.export_isis_base('/bases/artigo/artigo', os.path.join(self.tmp_dir, 'artigo.id'))
+
+    def test_i2id_is_found_in_cisis_path(self):
+        i2id_path = os.path.join(self.tmp_dir, 'i2id')
+        with open(i2id_path, 'w') as fout:
+            fout.write('#!/bin/sh\n')
+        os.chmod(i2id_path, 0o755)
+
+        with mock.patch.object(settings, 'CISIS_PATH', self.tmp_dir):
+            self.assertEqual(isis.get_i2id_path(), i2id_path)
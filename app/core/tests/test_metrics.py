@@ -0,0 +1,32 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+from unittest import mock
+
+from core import metrics
+
+
+class MultiprocessDirTest(SimpleTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, True)
+
+        patcher = mock.patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': self.tmp_dir})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_clear_removes_metrics_of_previous_runs(self):
+        for name in ('counter_12.db', 'histogram_13.db', 'README'):
+            open(os.path.join(self.tmp_dir, name), 'w').close()
+
+        metrics.clear_multiprocess_dir()
+
+        self.assertEqual(os.listdir(self.tmp_dir), ['README'])
+
+    def test_dead_processes_are_marked(self):
+        with mock.patch('core.metrics.multiprocess.mark_process_dead') as mark_process_dead:
+            metrics.mark_worker_process_dead(pid=12)
+
+        mark_process_dead.assert_called_once_with(12)
@@ -0,0 +1,20 @@
+from django.test import SimpleTestCase
+from importlib import import_module
+
+
+event_annotation_json = import_module('core.migrations.0006_event_annotation_json')
+
+
+class EventAnnotationJsonMigrationTest(SimpleTestCase):
+    def parse(self, value):
+        return event_annotation_json._parse_annotation(value)
+
+    def test_python_repr_is_parsed(self):
+        self.assertEqual(self.parse("{'pid': 'S0034-89102014000200001', 'errors': []}"), {'pid': 'S0034-89102014000200001', 'errors': []})
+
+    def test_json_is_parsed(self):
+        self.assertEqual(self.parse('{"pid": "S0034", "ok": true}'), {'pid': 'S0034', 'ok': True})
+
+    def test_malformed_values_are_kept_as_text(self):
+        for value in ("{'pid': 'S0034-8910201400020", 'package.zip', "{'pids': {1, 2}}", "{'data': b'x'}", '123', '[' * 100000):
+            self.assertEqual(self.parse(value), {'text': value}, value[:20])
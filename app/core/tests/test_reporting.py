@@ -0,0 +1,36 @@
+from django.test import TestCase
+from unittest import mock
+
+from core.models import TaskProgress
+from core.reporting import (
+    ProgressReporter,
+    add_aggregated_progress,
+    start_aggregated_progress,
+)
+
+
+class AggregatedProgressTest(TestCase):
+    def test_reporters_add_to_root_progress(self):
+        start_aggregated_progress('root')
+        add_aggregated_progress('root', total=5)
+
+        for items in ([False, False, True], [False, True]):
+            reporter = ProgressReporter(mock.Mock(), total=len(items), every=100, root_id='root')
+            for failed in items:
+                reporter.advance(failed=failed)
+            reporter.flush()
+
+        meta = TaskProgress.objects.get(task_id='root').meta()
+        self.assertEqual(meta['total'], 5)
+        self.assertEqual(meta['done'], 5)
+        self.assertEqual(meta['failed'], 2)
+
+    def test_flush_adds_only_new_items(self):
+        start_aggregated_progress('root')
+
+        reporter = ProgressReporter(mock.Mock(), every=1, root_id='root')
+        reporter.advance()
+        reporter.advance()
+        reporter.flush()
+
+        self.assertEqual(TaskProgress.objects.get(task_id='root').done, 2)
@@ -0,0 +1,153 @@
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from unittest import mock
+
+from core import controller, tasks, utils
+from core.events import event_sink
+from core.models import Event, IngressPackage, MigrationLedger
+
+import os
+import shutil
+import tempfile
+from spf import settings
+
+
+class SplitInLanesTest(SimpleTestCase):
+    def test_batches_are_distributed_round_robin(self):
+        lanes = tasks._split_in_lanes(list(range(10)), 2, 3)
+
+        self.assertEqual(lanes, [[[0, 1], [6, 7]], [[2, 3], [8, 9]], [[4, 5]]])
+
+    def test_lanes_do_not_exceed_batches(self):
+        self.assertEqual(tasks._split_in_lanes([1, 2, 3], 2, 4), [[[1, 2]], [[3]]])
+
+
+class IterPidsToMigrateTest(SimpleTestCase):
+    def setUp(self):
+        documents = {
+            ('10', ''): ['S3', 'S4'],
+            ('', '2020'): ['S5'],
+        }
+
+        def iter_documents_to_migrate(acronym, volume, pub_year, after=None):
+            return [mock.Mock(id=p) for p in documents[(volume, pub_year)] if not after or p > after]
+
+        patcher = mock.patch('core.tasks.controller.iter_documents_to_migrate', side_effect=iter_documents_to_migrate)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.sources = tasks._get_sources_to_migrate('10', '2020', 'S2,S1')
+
+    def test_pids_follow_sources_in_order(self):
+        pids = [p for _, p in tasks._iter_pids_to_migrate('abc', self.sources)]
+
+        self.assertEqual(pids, ['S1', 'S2', 'S3', 'S4', 'S5'])
+
+    def test_cursor_holds_pending_sources(self):
+        cursor = dict((p, s) for s, p in tasks._iter_pids_to_migrate('abc', self.sources))
+
+        self.assertEqual(cursor['S2'], self.sources)
+        self.assertEqual(cursor['S4'], [['volume', '10'], ['pub_year', '2020']])
+        self.assertEqual(cursor['S5'], [['pub_year', '2020']])
+
+    def test_resumes_after_pid_of_first_source(self):
+        pids = [p for _, p in tasks._iter_pids_to_migrate('abc', self.sources[1:], after='S3')]
+
+        self.assertEqual(pids, ['S4', 'S5'])
+
+
+class DispatchDocumentsPageTest(SimpleTestCase):
+    def setUp(self):
+        for name in ('chord', 'add_aggregated_progress', 'invalidate_catalog'):
+            patcher = mock.patch('core.tasks.%s' % name)
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+
+        for name, value in (('MIGRATION_LIST_PAGE_SIZE', 5), ('MIGRATION_BATCH_SIZE', 2), ('MIGRATION_CONCURRENCY', 2)):
+            patcher = mock.patch.object(settings, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.sources = tasks._get_sources_to_migrate('', '', ','.join('S%d' % i for i in range(1, 8)))
+
+    def test_dispatches_a_single_page_capped_by_concurrency(self):
+        result = tasks._dispatch_documents_page('root', 'abc', self.sources, None, False)
+
+        lanes = self.chord.call_args[0][0]
+        self.assertEqual(self.chord.call_count, 1)
+        self.assertEqual(len(lanes), 2)
+        self.assertEqual((result['documents'], result['batches']), (5, 3))
+        self.add_aggregated_progress.assert_called_once_with('root', total=5)
+
+    def test_next_page_is_dispatched_by_callback_from_cursor(self):
+        tasks._dispatch_documents_page('root', 'abc', self.sources, None, False)
+
+        callback = self.chord.return_value.call_args[0][0]
+        self.assertEqual(callback.task, tasks.task_migrate_documents_page.name)
+        self.assertEqual(callback.args, (None, 'root', 'abc', self.sources, 'S5', False))
+
+    def test_returns_summary_when_no_documents_remain(self):
+        summary = {'total': 7, 'succeeded': 7, 'failed': 0, 'skipped': 0}
+
+        self.assertEqual(tasks._dispatch_documents_page('root', 'abc', self.sources, 'S7', False, summary), summary)
+        self.chord.assert_not_called()
+        self.invalidate_catalog.assert_called_once_with()
+
+
+class MigrateDocumentsBatchTest(TestCase):
+    def setUp(self):
+        patcher = mock.patch('core.tasks.dsm_migration')
+        self.migrate_document = patcher.start().migrate_document
+        self.migrate_document.return_value = []
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch('core.tasks.controller.get_documents_fingerprints', return_value={'S1': 'a', 'S2': 'b'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        MigrationLedger.objects.create(pid='S1', fingerprint='a', status=MigrationLedger.Status.COMPLETED, last_run=timezone.now())
+        MigrationLedger.objects.create(pid='S2', fingerprint='old', status=MigrationLedger.Status.COMPLETED, last_run=timezone.now())
+
+    def migrate(self, force=False):
+        return tasks.task_migrate_documents_batch.apply(args=(None, ['S1', 'S2'], force)).get()
+
+    def test_skips_unchanged_documents(self):
+        summary = self.migrate()
+
+        self.migrate_document.assert_called_once_with('S2')
+        self.assertEqual((summary['succeeded'], summary['skipped']), (1, 1))
+        self.assertEqual(MigrationLedger.objects.get(pid='S2').fingerprint, 'b')
+
+    def test_force_migrates_unchanged_documents(self):
+        summary = self.migrate(force=True)
+
+        self.assertEqual(self.migrate_document.call_count, 2)
+        self.assertEqual((summary['succeeded'], summary['skipped']), (2, 0))
+
+
+class IngressPackageTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('operator')
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, True)
+
+        patcher = mock.patch.object(settings, 'MEDIA_INGRESS_TEMP', tmp_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.package_path = utils.create_file_path('package.zip')
+        open(self.package_path, 'wb').close()
+
+    @mock.patch('core.tasks.dsm_ingress')
+    def test_failed_upload_event_keeps_package_file(self, dsm_ingress):
+        dsm_ingress.upload_package.side_effect = ValueError('invalid package')
+
+        result = tasks.task_ingress_package.apply(args=(self.package_path, 'package.zip', self.user.id)).get()
+        event_sink.flush()
+
+        event = controller.filter_events(Event.objects.all(), package='package.zip', status=Event.Status.FAILED).get()
+        self.assertEqual(event.annotation, {'package_file': 'package.zip', 'error': 'invalid package'})
+        self.assertEqual(result['status'], IngressPackage.Status.UPLOADING_FAILURE)
+        self.assertFalse(os.path.exists(os.path.dirname(self.package_path)))
@@ -0,0 +1,146 @@
+import os
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase
+from unittest import mock
+
+from core import utils
+from spf import settings
+
+
+class PackageNameTest(SimpleTestCase):
+    def test_accepts_plain_zip_names(self):
+        self.assertTrue(utils.package_name_is_valid('0034-8910-rsp-48-2.zip'))
+        self.assertTrue(utils.package_name_is_valid('PACKAGE.ZIP'))
+
+    def test_rejects_other_extensions(self):
+        self.assertFalse(utils.package_name_is_valid('package.tar.gz'))
+        self.assertFalse(utils.package_name_is_valid('package.gzip'))
+        self.assertFalse(utils.package_name_is_valid('package'))
+        self.assertFalse(utils.package_name_is_valid('.zip'))
+        self.assertFalse(utils.package_name_is_valid(''))
+
+    def test_rejects_paths(self):
+        for name in ('../../x.zip', '/etc/x.zip', 'a/b.zip', '..\\x.zip', 'x..zip', 'x\x00.zip'):
+            self.assertFalse(utils.package_name_is_valid(name), name)
+
+
+class FilePathTest(SimpleTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        patcher = mock.patch.object(settings, 'MEDIA_INGRESS_TEMP', self.tmp_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.tmp_dir, True)
+
+    def test_file_path_stays_in_ingress_temp(self):
+        path = utils.create_file_path('../../x.zip')
+
+        self.assertEqual(os.path.dirname(os.path.dirname(path)), self.tmp_dir)
+        self.assertEqual(os.path.basename(path), 'x.zip')
+
+    def test_uploads_with_the_same_name_do_not_collide(self):
+        first = utils.write_file_to_disk(SimpleUploadedFile('package.zip', b'first'))['path']
+        second = utils.write_file_to_disk(SimpleUploadedFile('package.zip', b'second'))['path']
+
+        self.assertNotEqual(first, second)
+
+        utils.delete_file_path(first)
+
+        self.assertFalse(os.path.exists(os.path.dirname(first)))
+        with open(second, 'rb') as fin:
+            self.assertEqual(fin.read(), b'second')
+
+
+class ChunkedUploadTest(SimpleTestCase):
+    upload_id = 'a' * 32
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        patcher = mock.patch.object(settings, 'MEDIA_INGRESS_TEMP', self.tmp_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.tmp_dir, True)
+
+    def _chunk(self, content):
+        return SimpleUploadedFile('chunk', content)
+
+    def test_rejects_path_traversal_in_package_name(self):
+        for name in ('../../x.zip', '/etc/x.zip'):
+            with self.assertRaises(utils.ChunkedUploadError):
+                utils.start_chunked_upload(1, self.upload_id, name, 10)
+
+    def test_rejects_invalid_upload_id(self):
+        with self.assertRaises(utils.ChunkedUploadError):
+            utils.start_chunked_upload(1, '../x', 'package.zip', 10)
+
+    def test_assembles_chunks_received_out_of_order(self):
+        content = b'0123456789abcdefghij'
+        utils.start_chunked_upload(1, self.upload_id, 'package.zip', len(content))
+
+        utils.write_chunk_to_disk(1, self.upload_id, 10, self._chunk(content[10:]))
+        status = utils.write_chunk_to_disk(1, self.upload_id, 0, self._chunk(content[:5]))
+        self.assertEqual(status['received'], [[0, 5], [10, 10]])
+        self.assertFalse(status['complete'])
+
+        with self.assertRaises(utils.ChunkedUploadError):
+            utils.finish_chunked_upload(1, self.upload_id)
+
+        status = utils.write_chunk_to_disk(1, self.upload_id, 5, self._chunk(content[5:10]))
+        self.assertTrue(status['complete'])
+
+        result = utils.finish_chunked_upload(1, self.upload_id)
+        self.assertEqual(os.path.basename(result['package_path']), 'package.zip')
+        with open(result['package_path'], 'rb') as fin:
+            self.assertEqual(fin.read(), content)
+
+    def test_resumed_upload_keeps_received_chunks(self):
+        utils.start_chunked_upload(1, self.upload_id, 'package.zip', 10)
+        utils.write_chunk_to_disk(1, self.upload_id, 0, self._chunk(b'01234'))
+
+        status = utils.start_chunked_upload(1, self.upload_id, 'package.zip', 10)
+        self.assertEqual(status['received'], [[0, 5]])
+        self.assertEqual(status['received_size'], 5)
+
+    def test_rejects_chunk_out_of_bounds(self):
+        utils.start_chunked_upload(1, self.upload_id, 'package.zip', 10)
+
+        for offset in (-1, 8):
+            with self.assertRaises(utils.ChunkedUploadError):
+                utils.write_chunk_to_disk(1, self.upload_id, offset, self._chunk(b'01234'))
+
+    def test_uploads_are_isolated_by_user(self):
+        utils.start_chunked_upload(1, self.upload_id, 'package.zip', 10)
+
+        with self.assertRaises(utils.ChunkedUploadError):
+            utils.get_chunked_upload_status(2, self.upload_id)
+
+    def test_finished_uploads_with_the_same_name_do_not_collide(self):
+        paths = []
+        for upload_id, content in (('a' * 32, b'first'), ('b' * 32, b'other')):
+            utils.start_chunked_upload(1, upload_id, 'package.zip', len(content))
+            utils.write_chunk_to_disk(1, upload_id, 0, self._chunk(content))
+            paths.append(utils.finish_chunked_upload(1, upload_id)['package_path'])
+
+        self.assertNotEqual(paths[0], paths[1])
+        with open(paths[0], 'rb') as fin:
+            self.assertEqual(fin.read(), b'first')
+
+    def test_abandoned_uploads_are_removed(self):
+        utils.start_chunked_upload(1, self.upload_id, 'package.zip', 10)
+        utils.start_chunked_upload(2, 'b' * 32, 'package.zip', 10)
+        upload_path = utils.create_chunked_upload_path(1, self.upload_id)
+
+        # o envio do usuário 1 não recebe partes desde o início
+        old = os.stat(os.path.join(upload_path, 'parts')).st_mtime - settings.INGRESS_CHUNKED_UPLOAD_EXPIRATION - 1
+        for path in (upload_path, os.path.join(upload_path, 'parts')):
+            os.utime(path, (old, old))
+
+        utils.start_chunked_upload(3, 'c' * 32, 'package.zip', 10)
+
+        self.assertFalse(os.path.exists(upload_path))
+        self.assertTrue(os.path.exists(utils.create_chunked_upload_path(2, 'b' * 32)))
+        with self.assertRaises(utils.ChunkedUploadError):
+            utils.get_chunked_upload_status(1, self.upload_id)
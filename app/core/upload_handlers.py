@@ -0,0 +1,132 @@
+import queue
+import threading
+
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.utils import timezone
+from spf import settings
+
+from core.utils import (
+    create_staged_package_name,
+    get_minio_client,
+)
+
+
+class StreamAbortedError(IOError):
+    ...
+
+
+class StagedUploadedFile(UploadedFile):
+    """
+    Arquivo já armazenado no MinIO. O atributo object_name indica sua localização no bucket.
+    """
+    def __init__(self, object_name, name, content_type, size, charset, content_type_extra=None):
+        super().__init__(None, name, content_type, size, charset, content_type_extra)
+        self.object_name = object_name
+        self.datetime = timezone.now()
+
+
+class ChunkStream:
+    """
+    Fila limitada entre o recebimento dos dados da requisição (escrita) e o upload multipart do MinIO (leitura).
+    A memória utilizada não ultrapassa max_chunks partes da requisição mais uma parte do upload multipart.
+    """
+    def __init__(self, max_chunks=16):
+        self._queue = queue.Queue(maxsize=max_chunks)
+        self._buffer = bytearray()
+        self._eof = False
+        self._aborted = False
+
+    def write(self, data):
+        self._queue.put(data)
+
+    def close(self):
+        self._queue.put(None)
+
+    def abort(self):
+        self._aborted = True
+        self._queue.put(None)
+
+    def read(self, size=-1):
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            data = self._queue.get()
+            if data is None:
+                self._eof = True
+            else:
+                self._buffer.extend(data)
+
+        if self._aborted:
+            # impede que um envio interrompido seja concluído como um objeto truncado
+            raise StreamAbortedError('Upload interrupted')
+
+        if size < 0:
+            size = len(self._buffer)
+
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+
+        return data
+
+
+class MinioStreamingUploadHandler(FileUploadHandler):
+    """
+    Encaminha as partes recebidas pelo Django para um upload multipart no MinIO, sem gravar o arquivo em disco.
+    """
+    chunk_size = 1024 * 1024
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+
+        self.object_name = create_staged_package_name(self.file_name)
+        self.stream = ChunkStream()
+        self.error = None
+
+        self.uploader = threading.Thread(target=self._upload, daemon=True)
+        self.uploader.start()
+
+    def _upload(self):
+        try:
+            get_minio_client().put_object(
+                settings.MINIO_SCIELO_COLLECTION,
+                self.object_name,
+                self.stream,
+                length=-1,
+                part_size=settings.INGRESS_STREAMING_PART_SIZE,
+                content_type=self.content_type or 'application/octet-stream',
+            )
+        except Exception as e:
+            self.error = e
+            # libera o produtor, caso esteja bloqueado na fila
+            while True:
+                try:
+                    self.stream._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.error:
+            raise self.error
+        self.stream.write(raw_data)
+
+    def file_complete(self, file_size):
+        if self.error:
+            raise self.error
+
+        self.stream.close()
+        self.uploader.join()
+
+        if self.error:
+            raise self.error
+
+        return StagedUploadedFile(
+            self.object_name,
+            self.file_name,
+            self.content_type,
+            file_size,
+            self.charset,
+            self.content_type_extra,
+        )
+
+    def upload_interrupted(self):
+        self.stream.abort()
+        self.uploader.join()
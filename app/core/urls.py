@@ -23,6 +23,7 @@ user = [
 
 ingress = [
     path('ingress/package_upload/', views.UploadView.as_view(), name='ingress_package_upload'),
+    path('ingress/package_upload/chunk/', views.UploadChunkView.as_view(), name='ingress_package_upload_chunk'),
     path('ingress/package_download/', views.ingress_package_download_page, name='ingress_package_download'),
     path('ingress/package_list/', views.ingress_package_list_page, name='ingress_package_list'),
 ]
@@ -34,7 +35,10 @@ journal = [
 tracking = [
     url(r'^event/(?P<eid>[\d-]+)/$', views.event_status, name='event'),
     path('event/list/', views.event_list_page, name='event_list'),
+    path('status/', views.status_list, name='status_list'),
     path('task/update_status/', views.task_update_status, name='task_update_status'),
+    path('task/details/', views.task_result_details, name='task_result_details'),
+    path('metrics', views.metrics, name='metrics'),
 ]
 
 migration = [
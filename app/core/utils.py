@@ -1,24 +1,101 @@
+import glob
+import json
 import os
+import re
+import shutil
+import tempfile
+import time
+import zipfile
 
 from django.core.files.storage import FileSystemStorage
 from django.utils.translation import gettext as _
 from datetime import datetime
+from lxml import etree
+from minio import Minio
 from spf import settings
+from uuid import uuid4
+
+
+CHUNKED_UPLOAD_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
 
 
 class PathDoesNotExistError(Exception):
     ...
 
 
+class ChunkedUploadError(Exception):
+    ...
+
+
+class KeysetPage:
+    """
+    Página obtida por paginação por chave (keyset). Os cursores previous_cursor e next_cursor
+    correspondem às chaves do primeiro e do último item da página.
+    """
+    def __init__(self, object_list, has_previous, has_next, key):
+        self.object_list = object_list
+        self._has_previous = has_previous
+        self._has_next = has_next
+        self._key = key
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_other_pages(self):
+        return self._has_previous or self._has_next
+
+    @property
+    def previous_cursor(self):
+        if self.object_list:
+            return self._key(self.object_list[0])
+
+    @property
+    def next_cursor(self):
+        if self.object_list:
+            return self._key(self.object_list[-1])
+
+
 def package_name_is_valid(package_name):
+    """Um nome de pacote válido é um nome simples de arquivo .zip, sem separadores de diretório e sem '..'."""
+    if not package_name or '..' in package_name or '\x00' in package_name:
+        return False
+
+    if '/' in package_name or '\\' in package_name or package_name != os.path.basename(package_name):
+        return False
+
     filename, extension = os.path.splitext(package_name)
 
-    if extension.endswith('zip'):
-        return True
+    return bool(filename) and extension.lower() == '.zip'
 
 
 def create_file_path(filename):
-    return os.path.join(settings.MEDIA_INGRESS_TEMP, filename)
+    """
+    Cria um diretório exclusivo (uuid4) em MEDIA_INGRESS_TEMP e retorna o caminho do arquivo nele: pacotes enviados
+    com o mesmo nome não se sobrescrevem, e a remoção de um deles (ver delete_file_path) não afeta os demais.
+    """
+    directory = os.path.join(settings.MEDIA_INGRESS_TEMP, uuid4().hex)
+    os.makedirs(directory)
+
+    # apenas o nome do arquivo é considerado, de modo que o caminho resultante permaneça em MEDIA_INGRESS_TEMP
+    return os.path.join(directory, os.path.basename(filename))
+
+
+def delete_file_path(path):
+    """Remove um arquivo criado em create_file_path e o seu diretório exclusivo."""
+    fs_delete_file(path)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    if os.path.dirname(directory) == os.path.abspath(settings.MEDIA_INGRESS_TEMP):
+        shutil.rmtree(directory, ignore_errors=True)
 
 
 def write_file_to_disk(file):
@@ -53,9 +130,207 @@ def handle_upload_file(file):
         }
 
 
+def handle_staged_upload_file(file):
+    return {
+        'package_file': file.name,
+        'package_path': file.object_name,
+        'datetime': file.datetime,
+        'success': True,
+        'staged': True,
+    }
+
+
 def fs_delete_file(path):
     try:
         fs = FileSystemStorage(location=settings.MEDIA_INGRESS_TEMP)
         fs.delete(path)
     except FileNotFoundError:
         raise PathDoesNotExistError(_('File %s does not exist' % path))
+
+
+def create_chunked_upload_path(user_id, upload_id):
+    if not CHUNKED_UPLOAD_ID_PATTERN.match(upload_id or ''):
+        raise ChunkedUploadError(_('Invalid upload identifier'))
+
+    return os.path.join(settings.MEDIA_INGRESS_TEMP, 'chunked', str(user_id), upload_id)
+
+
+def _read_chunked_upload_metadata(upload_path):
+    try:
+        with open(os.path.join(upload_path, 'metadata.json')) as fin:
+            return json.load(fin)
+    except FileNotFoundError:
+        raise ChunkedUploadError(_('Upload %s does not exist') % os.path.basename(upload_path))
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for offset, length in sorted(ranges):
+        if merged and offset <= merged[-1][0] + merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], offset + length - merged[-1][0])
+        else:
+            merged.append([offset, length])
+    return merged
+
+
+def delete_expired_chunked_uploads(now=None):
+    """
+    Remove os envios em partes abandonados, de qualquer usuário: aqueles que não recebem partes há mais de
+    INGRESS_CHUNKED_UPLOAD_EXPIRATION segundos.
+    """
+    expiration = (now or time.time()) - settings.INGRESS_CHUNKED_UPLOAD_EXPIRATION
+    removed = []
+
+    for upload_path in glob.glob(os.path.join(settings.MEDIA_INGRESS_TEMP, 'chunked', '*', '*')):
+        # o diretório parts é alterado a cada parte recebida
+        paths = [os.path.join(upload_path, 'parts'), upload_path]
+        last_activity = max((os.stat(p).st_mtime for p in paths if os.path.exists(p)), default=None)
+
+        if last_activity is not None and last_activity < expiration:
+            shutil.rmtree(upload_path, ignore_errors=True)
+            removed.append(upload_path)
+
+    return removed
+
+
+def start_chunked_upload(user_id, upload_id, package_name, total_size):
+    """
+    Prepara o estado parcial de um envio em partes. Caso o envio já exista (retomada),
+    o estado atual é mantido e retornado. Os envios abandonados são removidos neste momento.
+    """
+    if not package_name_is_valid(package_name):
+        raise ChunkedUploadError(_('Invalid package name %s') % package_name)
+
+    if total_size <= 0:
+        raise ChunkedUploadError(_('Invalid package size'))
+
+    delete_expired_chunked_uploads()
+
+    upload_path = create_chunked_upload_path(user_id, upload_id)
+    os.makedirs(os.path.join(upload_path, 'parts'), exist_ok=True)
+
+    metadata_path = os.path.join(upload_path, 'metadata.json')
+    if not os.path.exists(metadata_path):
+        # arquivo de dados pré-alocado: cada parte é escrita diretamente na sua posição final
+        with open(os.path.join(upload_path, 'data'), 'wb') as fout:
+            fout.truncate(total_size)
+
+        with open(metadata_path, 'w') as fout:
+            json.dump({'package_name': package_name, 'total_size': total_size}, fout)
+
+    return get_chunked_upload_status(user_id, upload_id)
+
+
+def write_chunk_to_disk(user_id, upload_id, offset, chunk):
+    upload_path = create_chunked_upload_path(user_id, upload_id)
+    metadata = _read_chunked_upload_metadata(upload_path)
+
+    if offset < 0 or offset + chunk.size > metadata['total_size']:
+        raise ChunkedUploadError(_('Chunk out of package bounds'))
+
+    with open(os.path.join(upload_path, 'data'), 'r+b') as destination:
+        destination.seek(offset)
+        for c in chunk.chunks():
+            destination.write(c)
+
+    # cada parte recebida é registrada em um arquivo próprio, o que permite o envio de partes em paralelo
+    open(os.path.join(upload_path, 'parts', '%d-%d' % (offset, chunk.size)), 'w').close()
+
+    return get_chunked_upload_status(user_id, upload_id)
+
+
+def get_chunked_upload_status(user_id, upload_id):
+    upload_path = create_chunked_upload_path(user_id, upload_id)
+    metadata = _read_chunked_upload_metadata(upload_path)
+
+    ranges = []
+    for part in os.listdir(os.path.join(upload_path, 'parts')):
+        offset, length = part.split('-')
+        ranges.append((int(offset), int(length)))
+
+    received = _merge_ranges(ranges)
+    received_size = sum(length for offset, length in received)
+
+    return {
+        'upload_id': upload_id,
+        'package_name': metadata['package_name'],
+        'total_size': metadata['total_size'],
+        'received': received,
+        'received_size': received_size,
+        'complete': received_size == metadata['total_size'],
+    }
+
+
+def finish_chunked_upload(user_id, upload_id):
+    status = get_chunked_upload_status(user_id, upload_id)
+
+    if not status['complete']:
+        raise ChunkedUploadError(_('Upload %s is incomplete') % upload_id)
+
+    if not package_name_is_valid(status['package_name']):
+        raise ChunkedUploadError(_('Invalid package name %s') % status['package_name'])
+
+    upload_path = create_chunked_upload_path(user_id, upload_id)
+    path = create_file_path(status['package_name'])
+
+    # o pacote já está montado no arquivo de dados; basta movê-lo para o diretório temporário de ingresso
+    try:
+        os.replace(os.path.join(upload_path, 'data'), path)
+    except FileNotFoundError:
+        raise ChunkedUploadError(_('Upload %s was already finished') % upload_id)
+    shutil.rmtree(upload_path, ignore_errors=True)
+
+    return {
+        'package_file': status['package_name'],
+        'package_path': path,
+        'datetime': datetime.fromtimestamp(os.stat(path).st_ctime),
+        'success': True,
+    }
+
+
+def get_minio_client():
+    return Minio(
+        settings.MINIO_HOST,
+        access_key=settings.MINIO_ACCESS_KEY,
+        secret_key=settings.MINIO_SECRET_KEY,
+        secure=settings.MINIO_SECURE,
+    )
+
+
+def create_staged_package_name(package_name):
+    return '/'.join([settings.MINIO_SPF_DIR, 'staging', uuid4().hex, os.path.basename(package_name)])
+
+
+def fetch_staged_package(object_name):
+    """
+    Materializa um pacote enviado em modo streaming em um diretório temporário local ao worker.
+    O processamento do pacote (zip) exige acesso aleatório ao arquivo e dsm_ingress.upload_package recebe apenas um
+    caminho local; o download é feito uma única vez e o mesmo arquivo é usado para obter os PIDs do pacote.
+    """
+    path = os.path.join(tempfile.mkdtemp(prefix='spf-'), os.path.basename(object_name))
+    get_minio_client().fget_object(settings.MINIO_SCIELO_COLLECTION, object_name, path)
+
+    return path
+
+
+def delete_staged_package(object_name):
+    get_minio_client().remove_object(settings.MINIO_SCIELO_COLLECTION, object_name)
+
+
+def get_package_pids(package_path):
+    """Obtém os identificadores (scielo-v2 e scielo-v3) dos documentos XML contidos em um pacote (zip)."""
+    pids = set()
+
+    with zipfile.ZipFile(package_path) as zf:
+        for name in zf.namelist():
+            if not name.lower().endswith('.xml'):
+                continue
+            try:
+                root = etree.fromstring(zf.read(name))
+            except etree.XMLSyntaxError:
+                continue
+            for article_id in root.xpath('.//article-meta/article-id[@specific-use="scielo-v2" or @specific-use="scielo-v3"]'):
+                if article_id.text and article_id.text.strip():
+                    pids.add(article_id.text.strip())
+
+    return pids
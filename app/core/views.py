@@ -1,5 +1,10 @@
 from celery.result import AsyncResult
+from prometheus_client import CONTENT_TYPE_LATEST
 
+from core.catalog import (
+    JournalCatalog,
+    get_issues_by_year,
+)
 from core.decorators import (
     unauthenticated_user,
     allowed_users,
@@ -9,7 +14,8 @@ from core.forms import (
     UpdateUserForm,
     UploadPackageFileForm,
 )
-from core.models import Event
+from core.metrics import generate_metrics
+from core.models import Event, IngressPackage
 from core.tasks import (
     task_get_package_uri_by_pid,
     task_ingress_package,
@@ -17,8 +23,22 @@ from core.tasks import (
     task_migrate_documents,
     task_migrate_identify_documents,
     task_migrate_isis_db,
+    task_migrate_isis_db_sharded,
+)
+from core.upload_handlers import (
+    MinioStreamingUploadHandler,
+    StagedUploadedFile,
+)
+from core.utils import (
+    ChunkedUploadError,
+    delete_staged_package,
+    finish_chunked_upload,
+    get_chunked_upload_status,
+    handle_staged_upload_file,
+    handle_upload_file,
+    start_chunked_upload,
+    write_chunk_to_disk,
 )
-from core.utils import handle_upload_file
 
 from datetime import datetime
 
@@ -33,6 +53,8 @@ from django.contrib.auth.forms import PasswordChangeForm
 from django.core.files.storage import FileSystemStorage
 from django.core.paginator import Paginator
 from django.http.response import (
+    HttpResponse,
+    HttpResponseNotModified,
     HttpResponseRedirect,
     JsonResponse,
 )
@@ -41,21 +63,23 @@ from django.shortcuts import (
     redirect,
 )
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.decorators import method_decorator
 from django.utils.translation import gettext as _
 
-from dsm.extdeps.isis_migration.migration_models import ISISDocument
-
-from opac_schema.v1.models import Issue as OPACIssue
-
 from spf import settings
 
 import core.controller as controller
-import dsm.ingress as dsm_ingress
 import dsm.migration as dsm_migration
-import math
 import os
 
+from urllib.parse import urlencode
+
 from django.views import generic
+from django.views.decorators.csrf import (
+    csrf_exempt,
+    csrf_protect,
+)
 from braces.views import GroupRequiredMixin
 
 
@@ -182,7 +206,7 @@ def user_change_password_page(request):
 @login_required(login_url='login')
 @allowed_users(allowed_groups=['manager'])
 def user_groups_edit_page(request):
-    user_list = controller.get_users()
+    user_list = controller.get_users().prefetch_related('groups').order_by('id')
     available_groups = controller.get_groups()
 
     paginator = Paginator(user_list, 25)
@@ -190,15 +214,15 @@ def user_groups_edit_page(request):
     user_obj = paginator.get_page(page_number)
 
     if request.method == 'POST':
-        ev = controller.add_event(request.user, Event.Name.CHANGE_USER_GROUPS)
+        started = timezone.now()
 
-        for u in user_obj:
-            groups_names = request.POST.getlist('%s|user_groups' % u.username)
-            user_groups = controller.get_groups_from_groups_names(groups_names)
-            controller.update_user_groups(u, user_groups)
+        controller.update_users_groups({u: request.POST.getlist('%s|user_groups' % u.username) for u in user_obj})
 
         messages.success(request, _("Users' groups were updated"), extra_tags='alert-success')
-        controller.update_event(ev, {'status': Event.Status.COMPLETED})
+        controller.record_event(request.user, Event.Name.CHANGE_USER_GROUPS, started=started)
+
+        # obtém novamente a página, com os grupos atualizados
+        user_obj = paginator.get_page(page_number)
 
     return render(request, 'user/groups_edit.html', context={'user_obj': user_obj, 'available_groups': available_groups})
 
@@ -226,6 +250,24 @@ def user_profile_edit_page(request):
 #################
 # ingress views #
 #################
+def _queue_ingress_package(user, result):
+    # registra o pacote recebido e o coloca na fila de envio ao MinIO
+    ip = controller.add_ingress_package(user, result.get('datetime'), result.get('package_file'), IngressPackage.Status.RECEIVED)
+    controller.update_ingress_package_status(ip, IngressPackage.Status.QUEUED_FOR_UPLOADING)
+
+    # o envio ao MinIO é realizado pelo worker; a resposta não depende do tamanho do pacote
+    job = task_ingress_package.delay(result.get('package_path'), result.get('package_file'), user.id, ip.id, staged=result.get('staged', False))
+
+    return {
+        'datetime': result.get('datetime'),
+        'task_id': job.id,
+        'ingress_package_id': ip.id,
+        'status': ip.status,
+        'status_display': ip.get_status_display(),
+    }
+
+
+@method_decorator(csrf_exempt, name='dispatch')
 class UploadView(GroupRequiredMixin, generic.View):
     group_required = [u'manager', u'operator_ingress']
     redirect_unauthenticated_users = True
@@ -233,14 +275,44 @@ class UploadView(GroupRequiredMixin, generic.View):
 
     def get(self, request):
         form = UploadPackageFileForm()
-        return render(request, 'ingress/package_upload.html', context={'form': form})
+        return render(request, 'ingress/package_upload.html', context={
+            'form': form,
+            'streaming_upload': settings.INGRESS_STREAMING_UPLOAD,
+        })
 
     def post(self, request):
+        # os manipuladores de upload devem ser definidos antes do acesso a request.POST (inclusive pela verificação CSRF)
+        if settings.INGRESS_STREAMING_UPLOAD:
+            request.upload_handlers = [MinioStreamingUploadHandler(request)]
+
+        request.staged_package_queued = False
+        try:
+            return self._post(request)
+        finally:
+            if not request.staged_package_queued:
+                # formulário inválido, falha na verificação CSRF ou erro ao enfileirar: o objeto enviado ao MinIO
+                # não será processado pelo worker
+                self._delete_staged_files(request)
+
+    def _delete_staged_files(self, request):
+        # request._files só existe se o corpo da requisição foi processado
+        for file in getattr(request, '_files', {}).values():
+            if isinstance(file, StagedUploadedFile):
+                delete_staged_package(file.object_name)
+
+    @method_decorator(csrf_protect)
+    def _post(self, request):
         form = UploadPackageFileForm(request.POST, request.FILES)
 
         if form.is_valid():
-            ev = controller.add_event(request.user, Event.Name.UPLOAD_PACKAGE_TO_DISK, {'file_name': request.FILES['package_file'].name})
-            result = handle_upload_file(request.FILES['package_file'])
+            started = timezone.now()
+            annotation = {'file_name': request.FILES['package_file'].name}
+
+            if isinstance(request.FILES['package_file'], StagedUploadedFile):
+                # o pacote já foi enviado ao MinIO durante a requisição
+                result = handle_staged_upload_file(request.FILES['package_file'])
+            else:
+                result = handle_upload_file(request.FILES['package_file'])
 
             json_data = {
                 'package_path': result.get('package_path'),
@@ -249,17 +321,84 @@ class UploadView(GroupRequiredMixin, generic.View):
             }
             
             if result.get('success'):
-                controller.update_event(ev, {'status': Event.Status.COMPLETED})
-                task_ingress_package(json_data.get('package_path'), json_data.get('package_file'), request.user.id)
-                json_data.update({'datetime': result.get('datetime'),})
+                controller.record_event(request.user, Event.Name.UPLOAD_PACKAGE_TO_DISK, annotation, Event.Status.COMPLETED, started)
+                json_data.update(_queue_ingress_package(request.user, result))
+                # a partir daqui, o objeto enviado ao MinIO é removido pelo worker
+                request.staged_package_queued = True
                 return JsonResponse(json_data)
             else:
+                controller.record_event(request.user, Event.Name.UPLOAD_PACKAGE_TO_DISK, annotation, Event.Status.FAILED, started)
                 json_data.update({'error': result.get('error'),})
                 return JsonResponse(json_data)  
         else:
             return JsonResponse({'error': _('Invalid form data')})
 
 
+class UploadChunkView(GroupRequiredMixin, generic.View):
+    """
+    Envio retomável de pacotes em partes.
+
+    POST action=start (upload_id, package_name, total_size): prepara o envio ou retorna o estado de um envio já iniciado
+    POST action=chunk (upload_id, offset, chunk): grava uma parte na sua posição; partes podem ser enviadas em paralelo
+    POST action=complete (upload_id): finaliza o envio e coloca o pacote na fila de ingresso
+    GET upload_id: retorna as faixas de bytes já recebidas
+    """
+    group_required = [u'manager', u'operator_ingress']
+    redirect_unauthenticated_users = True
+    login_url = '/login/'
+
+    def get(self, request):
+        try:
+            return JsonResponse(get_chunked_upload_status(request.user.id, request.GET.get('upload_id')))
+        except ChunkedUploadError as e:
+            return JsonResponse({'error': str(e)}, status=404)
+
+    def post(self, request):
+        action = request.POST.get('action')
+        upload_id = request.POST.get('upload_id')
+
+        try:
+            if action == 'start':
+                status = start_chunked_upload(
+                    request.user.id,
+                    upload_id,
+                    request.POST.get('package_name', ''),
+                    int(request.POST.get('total_size', 0)),
+                )
+                return JsonResponse(status)
+
+            if action == 'chunk':
+                if 'chunk' not in request.FILES:
+                    return JsonResponse({'error': _('Invalid form data')}, status=400)
+                status = write_chunk_to_disk(request.user.id, upload_id, int(request.POST.get('offset', -1)), request.FILES['chunk'])
+                return JsonResponse(status)
+
+            if action == 'complete':
+                status = get_chunked_upload_status(request.user.id, upload_id)
+                started = timezone.now()
+                annotation = {'file_name': status['package_name']}
+                try:
+                    result = finish_chunked_upload(request.user.id, upload_id)
+                except ChunkedUploadError:
+                    controller.record_event(request.user, Event.Name.UPLOAD_PACKAGE_TO_DISK, annotation, Event.Status.FAILED, started)
+                    raise
+                controller.record_event(request.user, Event.Name.UPLOAD_PACKAGE_TO_DISK, annotation, Event.Status.COMPLETED, started)
+
+                json_data = {
+                    'package_path': result.get('package_path'),
+                    'package_file': result.get('package_file'),
+                }
+                json_data.update(_queue_ingress_package(request.user, result))
+                return JsonResponse(json_data)
+
+        except ValueError:
+            return JsonResponse({'error': _('Invalid form data')}, status=400)
+        except ChunkedUploadError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        return JsonResponse({'error': _('Invalid form data')}, status=400)
+
+
 @login_required(login_url='login')
 @allowed_users(allowed_groups=['manager', 'operator_ingress'])
 def ingress_package_download_page(request):
@@ -279,8 +418,13 @@ def ingress_package_download_page(request):
         }
         return render(request, 'ingress/package_download.html', context)
 
-    # Inicializa task para o PID informado e redireciona para a própria página aguardando resultado
     elif pid:
+        # Consulta já realizada e mantida em cache: responde sem iniciar task
+        data = controller.get_cached_package_uri(pid)
+        if data:
+            return render(request, 'ingress/package_download.html', context={'pid': pid, 'data': data})
+
+        # Inicializa task para o PID informado e redireciona para a própria página aguardando resultado
         job = task_get_package_uri_by_pid.delay(pid, request.user.id)
         return HttpResponseRedirect(reverse('ingress_package_download') + '?job=' + job.id + '&pid=' + pid)
 
@@ -292,11 +436,14 @@ def ingress_package_download_page(request):
 @allowed_users(allowed_groups=['manager', 'operator_ingress'])
 def ingress_package_list_page(request):
     request_scope = request.GET.get('scope', '')
-    deposited_package_list = controller.get_ingress_packages_from_user_and_scope(request.user, request_scope)
+    deposited_package_list = controller.get_ingress_packages_from_user_and_scope(request.user, request_scope).select_related('user')
 
-    paginator = Paginator(deposited_package_list, 25)
-    page_number = request.GET.get('page')
-    deposited_package_obj = paginator.get_page(page_number)
+    deposited_package_obj = controller.paginate_by_datetime_keyset(
+        deposited_package_list,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        last=request.GET.get('last'),
+    )
 
     return render(request, 'ingress/package_list.html', context={'deposited_package_obj': deposited_package_obj, 'scope': request_scope})
 
@@ -307,9 +454,7 @@ def ingress_package_list_page(request):
 @login_required(login_url='login')
 @allowed_users(allowed_groups=['manager', 'operator_ingress'])
 def journal_list_page(request):
-    journal_list = dsm_ingress._journals_manager.get_journals()
-
-    paginator = Paginator(journal_list, 25)
+    paginator = Paginator(JournalCatalog(), 25)
     page_number = request.GET.get('page')
     journal_obj = paginator.get_page(page_number)
 
@@ -322,13 +467,32 @@ def journal_list_page(request):
 @login_required(login_url='login')
 def event_list_page(request):
     request_scope = request.GET.get('scope', '')
-    event_list = controller.get_events_from_user_and_scope(request.user, request_scope).order_by('-datetime')
+    filters = {k: request.GET.get(k, '').strip() for k in ('pid', 'package', 'status', 'name')}
 
-    paginator = Paginator(event_list, 25)
-    page_number = request.GET.get('page')
-    event_obj = paginator.get_page(page_number)
+    event_list = controller.get_events_from_user_and_scope(request.user, request_scope).select_related('user')
+    event_list = controller.filter_events(event_list, **filters)
+
+    event_obj = controller.paginate_by_datetime_keyset(
+        event_list,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        last=request.GET.get('last'),
+    )
+
+    # parâmetros mantidos nos links de navegação
+    query = urlencode({k: v for k, v in dict(filters, scope=request_scope).items() if v})
 
-    return render(request, 'tracking/event_list.html', context={'event_obj': event_obj, 'scope': request_scope, 'autocheck_status_update': 1})
+    context = {
+        'event_obj': event_obj,
+        'scope': request_scope,
+        'filters': filters,
+        'query': query,
+        'status_choices': Event.Status.choices,
+        'name_choices': Event.Name.choices,
+        'autocheck_status_update': 1,
+    }
+
+    return render(request, 'tracking/event_list.html', context=context)
 
 
 @login_required(login_url='login')
@@ -357,6 +521,42 @@ def event_status(request, eid):
         return JsonResponse({'error': _('No results were found')})
 
 
+@login_required(login_url='login')
+@allowed_users(allowed_groups=['manager', 'operator_ingress', 'operator_migration', 'quality_analyst'])
+def status_list(request):
+    """
+    Obtém, em uma única requisição, o estado de vários eventos (event=<id>) e tasks (task=<task_id>).
+    Responde 304, sem consultar os estados, quando nada mudou desde a resposta identificada pelo cabeçalho
+    If-None-Match.
+    """
+    try:
+        event_ids = [int(e) for e in request.GET.getlist('event')]
+    except ValueError:
+        return JsonResponse({'error': _('Invalid form data')}, status=400)
+    task_ids = request.GET.getlist('task')
+
+    # o ETag é obtido de consultas agregadas, antes da leitura dos estados e dos resultados das tasks
+    etag = '"%s"' % controller.get_status_version_tag(request.user, event_ids, task_ids)
+
+    if etag in [t.strip() for t in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse({
+            'events': controller.get_events_status(request.user, event_ids) if event_ids else {},
+            'tasks': controller.get_tasks_status(task_ids) if task_ids else {},
+        })
+
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+
+    return response
+
+
+def metrics(request):
+    """Métricas da aplicação e das tasks no formato do Prometheus (acesso restrito à rede interna; ver nginx.conf)."""
+    return HttpResponse(generate_metrics(), content_type=CONTENT_TYPE_LATEST)
+
+
 @login_required(login_url='login')
 @allowed_users(allowed_groups=['manager', 'operator_ingress', 'operator_migration', 'quality_analyst'])
 def task_update_status(request):
@@ -379,19 +579,41 @@ def task_update_status(request):
     return JsonResponse(json_data)
 
 
+@login_required(login_url='login')
+@allowed_users(allowed_groups=['manager', 'operator_ingress', 'operator_migration', 'quality_analyst'])
+def task_result_details(request):
+    """Obtém, página a página, o resultado de cada item processado por uma task."""
+    task_id = request.GET.get('task_id', '')
+
+    try:
+        after = int(request.GET.get('after', 0))
+    except ValueError:
+        return JsonResponse({'error': _('Invalid form data')}, status=400)
+
+    details = controller.get_task_result_details(task_id, after, 100)
+
+    json_data = {
+        'task_id': task_id,
+        'items': [{'item': d.item, 'status': d.status, 'message': d.message, 'datetime': d.datetime} for d in details],
+        'after': details[-1].id if details else None,
+    }
+
+    return JsonResponse(json_data)
+
+
 ###################
 # migration views #
 ###################
 @login_required(login_url='login')
 @allowed_users(allowed_groups=['manager', 'operator_migration'])
 def migrate_identify_documents(request):
-    # registra evento de identificação
-    ev = controller.add_event(request.user, Event.Name.IDENTIFY_DOCUMENTS_TO_MIGRATE)
+    started = timezone.now()
 
     # identifica documentos para migrar
     task_migrate_identify_documents.delay()
 
-    controller.update_event(ev, {'status': Event.Status.COMPLETED})
+    # registra evento de identificação
+    controller.record_event(request.user, Event.Name.IDENTIFY_DOCUMENTS_TO_MIGRATE, started=started)
 
     # informa mensagem de sucesso
     messages.success(request, _('Task submitted successfully'), extra_tags='alert alert-success')
@@ -399,6 +621,13 @@ def migrate_identify_documents(request):
     return redirect('event_list')
 
 
+def _queue_isis_db_migration(event, data_type, path):
+    if settings.ISIS_MIGRATION_SHARDS:
+        task_migrate_isis_db_sharded.delay(data_type, path, event.id)
+    else:
+        task_migrate_isis_db.delay(data_type, path)
+
+
 @login_required(login_url='login')
 @allowed_users(allowed_groups=['manager', 'operator_migration'])
 def migrate_isis_db_page(request):
@@ -423,7 +652,7 @@ def migrate_isis_db_page(request):
             ev = controller.add_event(request.user, Event.Name.START_MIGRATION_BY_ID_FILE, {'path': fs_full_path_id_file})
 
             # inica task para efetuar migração
-            task_migrate_isis_db.delay(data_type, fs_full_path_id_file)
+            _queue_isis_db_migration(ev, data_type, fs_full_path_id_file)
 
             input_path = fs_full_path_id_file
 
@@ -436,7 +665,7 @@ def migrate_isis_db_page(request):
             ev = controller.add_event(request.user, Event.Name.START_MIGRATION_BY_ISIS_DB, {'path': full_isis_path})
 
             # inica task para efetuar migração
-            task_migrate_isis_db.delay(data_type, full_isis_path)
+            _queue_isis_db_migration(ev, data_type, full_isis_path)
 
             input_path = full_isis_path
 
@@ -447,8 +676,9 @@ def migrate_isis_db_page(request):
             # informa mensagem de sucesso
             messages.success(request, _('Task submitted successfully'), extra_tags='alert alert-success')
 
-            # atualiza estado do evento de migração
-            controller.update_event(ev, {'status': Event.Status.COMPLETED})
+            # atualiza estado do evento de migração (no modo particionado, o evento é atualizado ao final da migração)
+            if not settings.ISIS_MIGRATION_SHARDS:
+                controller.update_event(ev, {'status': Event.Status.COMPLETED})
 
         return redirect('event_list')
 
@@ -458,15 +688,20 @@ def migrate_isis_db_page(request):
 @login_required(login_url='login')
 @allowed_users(allowed_groups=['manager', 'operator_migration'])
 def migrate_search_pending_documents_page(request):
-    page_number = int(request.GET.get('page', 1))
+    after = request.GET.get('after', None)
+    before = request.GET.get('before', None)
+    last = request.GET.get('last', None)
+
     pub_year = request.GET.get('pub_year', None)
     acron = request.GET.get('acron', None)
     volume = request.GET.get('volume', None)
 
     year = request.GET.get('year', None)
     issn = request.GET.get('issn', None)
+    issue_order = request.GET.get('issue_order', None)
     pid = request.GET.get('pid', None)
 
+    documents = None
     pending_documents = []
     paginator = None
 
@@ -478,67 +713,43 @@ def migrate_search_pending_documents_page(request):
     url = '?'
 
     if issn or year or pid:
-        filter = ''
-
         if pid:
-            filter = pid
+            url += 'pid='+pid+'&'
         else:
             if issn:
-                filter = issn
                 url += 'issn='+issn+'&'
             if year:
-                filter += year
                 url += 'year='+year+'&'
+            if issue_order:
+                url += 'issue_order='+issue_order+'&'
 
-        filter_documents = ISISDocument.objects.filter(_id__contains = filter)
-        paginator = Paginator(filter_documents, 25)
-        pending_documents = paginator.get_page(page_number)
-
-        setattr(paginator, 'exists', False)
-        setattr(search, 'url', url)
+        # pesquisa pelos componentes do PID (ISSN, ano, ordem do fascículo)
+        try:
+            documents = controller.search_isis_documents(issn=issn, year=year, issue_order=issue_order, pid=pid)
+        except controller.DocumentsQueryError as e:
+            messages.error(request, str(e), extra_tags='alert-danger')
 
     elif acron or volume or pub_year:
-        pending_documents = dsm_migration.list_documents_to_migrate(acron, volume, pub_year, "", "", items_per_page=25, page_number=page_number, status="")
-        total_documents = dsm_migration.list_documents_to_migrate(acron, volume, pub_year, "", "", items_per_page=1000, page_number=int(1), status="")
-
-        paginator = Object()
-        has_next = False
-        has_previous = False
-        next_page_number = ''
-        previous_page_number = ''
-        num_pages = math.ceil(len(total_documents)/25)
-
-        if num_pages > page_number:
-            next_page_number = page_number + 1
-            has_next = True
-
-        if page_number > 1:
-            previous_page_number = page_number - 1
-            has_previous = True
-
-        setattr(paginator, 'exists', True)
-        setattr(paginator, 'page_number', page_number)
-        setattr(paginator, 'num_pages', num_pages)
-        setattr(paginator, 'has_next', has_next)
-        setattr(paginator, 'has_previous', has_previous)
-        setattr(paginator, 'next_page_number', next_page_number)
-        setattr(paginator, 'previous_page_number', previous_page_number)
+        documents = controller.get_documents_to_migrate(acron, volume, pub_year)
 
         if pub_year:
-            setattr(paginator, 'pub_year', pub_year)
             url += 'pub_year='+pub_year+'&'
 
         if acron:
-            setattr(paginator, 'acron', acron)
             url += 'acron='+acron+'&'
 
         if volume:
-            setattr(paginator, 'volume', volume)
             url += 'volume='+volume+'&'
 
-        if url != '?':
-            setattr(search, 'exists', False)
+        setattr(search, 'exists', False)
 
+    if documents is not None:
+        # paginação por chave (PID): o custo de cada página independe da sua profundidade
+        pending_documents = controller.paginate_documents_by_keyset(documents, after, before, last, 25)
+
+        paginator = Object()
+        setattr(paginator, 'exists', True)
+        setattr(paginator, 'count', documents.count())
         setattr(paginator, 'url', url)
 
     if request.method == 'POST':
@@ -552,18 +763,15 @@ def migrate_search_pending_documents_page(request):
             for p in pending_documents:
                 migrate.append(p.id)
 
-        if request.POST.get('migrate') == "all":
-            for f in filter_documents:
-                migrate.append(f.id)
+        if request.POST.get('migrate') == "all" and documents is not None:
+            migrate.extend(documents.order_by('pk').scalar('pk'))
 
         task_migrate_documents.delay(pid=",".join(migrate))
 
-        ev = controller.add_event(request.user, Event.Name.START_MIGRATION_BY_AVY)
+        controller.record_event(request.user, Event.Name.START_MIGRATION_BY_AVY)
 
         messages.success(request, _('Task submitted successfully'), extra_tags='alert alert-success')
 
-        controller.update_event(ev, {'status': Event.Status.COMPLETED})
-
         return redirect('event_list')
 
     return render(request, 'migration/search_pending_documents.html', context={'documents_obj': pending_documents, 'paginator': paginator, 'search': search})
@@ -572,9 +780,7 @@ def migrate_search_pending_documents_page(request):
 @login_required(login_url='login')
 @allowed_users(allowed_groups=['manager', 'operator_migration'])
 def migrate_pending_documents_by_journal_list_page(request):
-    journals = dsm_ingress._journals_manager.get_journals()
-
-    paginator = Paginator(journals, 25)
+    paginator = Paginator(JournalCatalog(), 25)
     page_number = request.GET.get('page')
     journals_obj = paginator.get_page(page_number)
 
@@ -583,12 +789,10 @@ def migrate_pending_documents_by_journal_list_page(request):
         task_migrate_acron.delay(",".join(acronym))
 
         # registra evento de migração por acrônimo
-        ev = controller.add_event(request.user, Event.Name.START_MIGRATION_BY_ACRONYM)
+        controller.record_event(request.user, Event.Name.START_MIGRATION_BY_ACRONYM)
 
         messages.success(request, _('Task submitted successfully'), extra_tags='alert alert-success')
 
-        controller.update_event(ev, {'status': Event.Status.COMPLETED})
-
         return redirect('event_list')
 
     return render(request, 'migration/pending_documents_by_journal_list.html', context={'journals_obj': journals_obj})
@@ -613,49 +817,15 @@ def migrate_pending_documents_by_issue_list_page(request):
         task_migrate_documents.delay(acronym=acron, volume=volumes, pub_year=years)
 
         # registra evento de migração por acrônimo, volume e ano
-        ev = controller.add_event(request.user, Event.Name.START_MIGRATION_BY_AVY)
+        controller.record_event(request.user, Event.Name.START_MIGRATION_BY_AVY)
 
         messages.success(request, _('Task submitted successfully'), extra_tags='alert alert-success')
 
-        controller.update_event(ev, {'status': Event.Status.COMPLETED})
-
         return redirect('event_list')
 
     issue = request.GET.get('issue')
     acron = request.GET.get('acron')
-    issues = OPACIssue.objects.filter(journal=issue)
-    i_prev = ''
-    issue_obj = None
-    issues_obj = []
-
-    class Issue:
-        def __init__(self, volumes = None, year = None):
-            if volumes:
-                self.volumes = volumes
-            else:
-                self.volumes = []
-            self.year = year
-
-    for num, i in enumerate(issues):
-        if i.year != i_prev:
-            if issue_obj:
-                if issue_obj.year:
-                    issues_obj.append(issue_obj)
-            issue_obj = Issue()
-            i_prev = i.year
-            issue_obj.year = i.year
-
-        volume = ''
-
-        if i.volume:
-            volume = 'v' + str(i.volume)
-
-        if i.number:
-            volume += 'n' + str(i.number)
-
-        issue_obj.volumes.append(volume)
-        if num == len(issues)-1:
-            issues_obj.append(issue_obj)
+    issues_obj = get_issues_by_year(issue)
 
     paginator = Paginator(issues_obj, 25)
     page_number = request.GET.get('page')
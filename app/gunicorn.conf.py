@@ -0,0 +1,13 @@
+"""
+Configuração do gunicorn (serviços web e stream do docker-compose.yml).
+"""
+from core.metrics import clear_multiprocess_dir, mark_process_dead
+
+
+def on_starting(server):
+    # as métricas de execuções anteriores do contêiner não devem ser somadas às atuais
+    clear_multiprocess_dir()
+
+
+def child_exit(server, worker):
+    mark_process_dead(worker.pid)
@@ -8,6 +8,8 @@ requires = [
     'Django',
     'django-celery-results',
     'gunicorn',
+    'uvicorn',
+    'prometheus-client',
     'pytz',
     'python-dateutil',
     'sqlparse',
@@ -13,4 +13,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'spf.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from core.streams import status_stream  # noqa: E402 (depende da configuração do Django)
+
+
+async def application(scope, receive, send):
+    # os estados de eventos e tasks são enviados por SSE, sem passar pelo ciclo de requisição do Django. As demais
+    # requisições são atendidas pelo Django, que grava o corpo inteiro da requisição em um arquivo temporário antes de
+    # chamar a view; em produção, elas são atendidas pelo servidor WSGI (ver docker-compose.yml)
+    if scope['type'] == 'http' and scope['path'] == '/stream/status/':
+        return await status_stream(scope, receive, send)
+
+    return await django_application(scope, receive, send)
@@ -23,6 +23,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -64,6 +65,15 @@ DATABASES = {
     },
 }
 
+# o cache é compartilhado pelos processos web e pelos workers (que gravam e invalidam entradas lidas pela aplicação
+# web); a tabela do backend em banco de dados é criada pela migração core.0008_cache_table
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', 'spf_cache'),
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -112,6 +122,97 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'mediafiles')
 
 MEDIA_INGRESS_TEMP = os.path.join(MEDIA_ROOT, 'ingress', 'tmp')
 
+MINIO_HOST = os.environ.get('MINIO_HOST', 'localhost:9000')
+
+MINIO_ACCESS_KEY = os.environ.get('MINIO_ACCESS_KEY', 'minioadmin')
+
+MINIO_SECRET_KEY = os.environ.get('MINIO_SECRET_KEY', 'minioadmin')
+
+MINIO_SECURE = os.environ.get('MINIO_SECURE', 'false').lower() == 'true'
+
+MINIO_SCIELO_COLLECTION = os.environ.get('MINIO_SCIELO_COLLECTION', 'spf')
+
+MINIO_SPF_DIR = os.environ.get('MINIO_SPF_DIR', 'ingress')
+
+# envia o pacote diretamente ao MinIO (upload multipart) durante a requisição, sem gravá-lo em MEDIA_INGRESS_TEMP
+INGRESS_STREAMING_UPLOAD = int(os.environ.get('INGRESS_STREAMING_UPLOAD', 0))
+
+INGRESS_STREAMING_PART_SIZE = int(os.environ.get('INGRESS_STREAMING_PART_SIZE', 10 * 1024 * 1024))
+
+# tempo (em segundos) sem receber partes após o qual um envio em partes é considerado abandonado e removido
+INGRESS_CHUNKED_UPLOAD_EXPIRATION = int(os.environ.get('INGRESS_CHUNKED_UPLOAD_EXPIRATION', 24 * 60 * 60))
+
 CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'pyamqp://broker:5672'),
 
 CELERY_RESULT_BACKEND = 'django-db'
+
+# filas por tipo de carga: consultas interativas, ingresso de pacotes e migração em lote, cada uma atendida por
+# workers próprios (ver docker-compose.yml), de modo que migrações longas não atrasem as consultas interativas
+CELERY_TASK_DEFAULT_QUEUE = 'interactive'
+
+CELERY_TASK_ROUTES = {
+    'core.tasks.task_get_package_uri_by_pid': {'queue': 'interactive'},
+    'core.tasks.task_ingress_package': {'queue': 'ingress'},
+    'core.tasks.task_migrate_*': {'queue': 'migration'},
+}
+
+# prioridades (0 a 9) dentro de cada fila; as filas são declaradas no RabbitMQ com suporte a prioridade
+CELERY_TASK_QUEUE_MAX_PRIORITY = 10
+
+CELERY_TASK_DEFAULT_PRIORITY = 5
+
+# quantidade de documentos por task de migração
+MIGRATION_BATCH_SIZE = int(os.environ.get('MIGRATION_BATCH_SIZE', 100))
+
+# quantidade máxima de tasks de migração (lotes) executadas simultaneamente em uma migração de documentos
+MIGRATION_CONCURRENCY = int(os.environ.get('MIGRATION_CONCURRENCY', 4))
+
+# quantidade de documentos obtidos por consulta ao percorrer os documentos a migrar (cada página é despachada ao final da anterior)
+MIGRATION_LIST_PAGE_SIZE = int(os.environ.get('MIGRATION_LIST_PAGE_SIZE', 1000))
+
+# intervalo mínimo (em segundos) e quantidade mínima de itens entre duas atualizações de progresso de uma task
+TASK_PROGRESS_INTERVAL = float(os.environ.get('TASK_PROGRESS_INTERVAL', 5))
+
+TASK_PROGRESS_EVERY = int(os.environ.get('TASK_PROGRESS_EVERY', 500))
+
+# quantidade de registros de resultado por item acumulados antes de cada gravação em lote
+TASK_RESULT_DETAIL_BUFFER_SIZE = int(os.environ.get('TASK_RESULT_DETAIL_BUFFER_SIZE', 500))
+
+# tempo (em segundos) durante o qual os grupos de um usuário são mantidos em cache entre requisições (0 desativa)
+PERMISSIONS_CACHE_TIMEOUT = int(os.environ.get('PERMISSIONS_CACHE_TIMEOUT', 0))
+
+# intervalo (em segundos) entre as leituras da versão dos estados (core.status), realizadas uma vez por processo
+STATUS_STREAM_INTERVAL = float(os.environ.get('STATUS_STREAM_INTERVAL', 0.5))
+
+# intervalo máximo (em segundos) entre duas consultas de estado de uma conexão SSE, mesmo sem mudança de versão
+STATUS_STREAM_REFRESH = int(os.environ.get('STATUS_STREAM_REFRESH', 15))
+
+# duração máxima (em segundos) de uma conexão SSE; o navegador reconecta automaticamente
+STATUS_STREAM_TIMEOUT = int(os.environ.get('STATUS_STREAM_TIMEOUT', 300))
+
+# tempo (em segundos) durante o qual as páginas do catálogo de periódicos são mantidas em cache
+JOURNAL_CATALOG_TIMEOUT = int(os.environ.get('JOURNAL_CATALOG_TIMEOUT', 600))
+
+# quantidade de registros de cada parte na qual um arquivo id é dividido durante a migração (0 migra o arquivo inteiro)
+ISIS_MIGRATION_CHUNK_SIZE = int(os.environ.get('ISIS_MIGRATION_CHUNK_SIZE', 1000))
+
+# quantidade de partes (tasks paralelas) nas quais uma base ISIS é dividida durante a migração (0 migra a base em uma única task)
+ISIS_MIGRATION_SHARDS = int(os.environ.get('ISIS_MIGRATION_SHARDS', 0))
+
+# diretório do CISIS, utilizado para exportar bases ISIS para arquivos id
+CISIS_PATH = os.environ.get('CISIS_PATH', '')
+
+# tempo (em segundos) durante o qual o resultado da consulta de pacotes por PID é mantido em cache (0 desativa)
+PACKAGE_URI_CACHE_TIMEOUT = int(os.environ.get('PACKAGE_URI_CACHE_TIMEOUT', 3600))
+
+# quantidade máxima de eventos concluídos acumulados em memória antes de uma gravação em lote
+EVENT_BUFFER_SIZE = int(os.environ.get('EVENT_BUFFER_SIZE', 100))
+
+# tempo máximo (em segundos) durante o qual um evento concluído permanece em memória antes da gravação em lote
+EVENT_BUFFER_TIMEOUT = float(os.environ.get('EVENT_BUFFER_TIMEOUT', 5))
+
+# porta na qual cada worker do Celery expõe suas métricas (0 não expõe)
+METRICS_WORKER_PORT = int(os.environ.get('METRICS_WORKER_PORT', 0))
+
+# filas do broker cuja quantidade de mensagens aguardando é exposta em /metrics
+METRICS_BROKER_QUEUES = ['interactive', 'ingress', 'migration']